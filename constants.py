@@ -2,12 +2,12 @@ import os
 
 from PyQt6.QtGui import QColor
 
-import utils
+from utils.misc import get_project_root
 
 APPLICATION_NAME = "Music Player"
 APPLICATION_VERSION = "0.0.19"
 
-SUPPORTED_AUDIO_FORMATS = {".mp3"}
+SUPPORTED_AUDIO_FORMATS = {".mp3", ".flac", ".ogg", ".opus", ".m4a", ".wav"}
 
 # Gui constants
 
@@ -42,13 +42,42 @@ LIGHT_AUDIO_CONTROLLER_HOVER_COLOR = QColor(190, 190, 190)
 
 MAIN_PANEL_COLUMN_NAMES = ("", "", "Artist", "Title", "Album", "Year", "Genre", "Rating", "Time")
 MAIN_PANEL_VIEW_OPTIONS = ("Tracks", )
+MAIN_PANEL_FETCH_SIZE = 250  # rows added to the track table each time it's scrolled to the end
+MAIN_PANEL_ELIDED_TEXT_CACHE_SIZE = 10_000  # elided cell texts kept by the track table delegate
+SEARCH_PREFIX_CACHE_SIZE = 256  # prefixes whose matching track ids are kept by the track search index
 GROUP_OPTIONS = ("Album", "Artist", "Composer", "Folder", "Genre", "Year")
 
-ROOT = utils.get_project_root(__file__)
+ROOT = get_project_root(__file__)
 
 # Database constants
 
 DATABASE_PATH = os.path.join(ROOT, "database/tracks_database.db")
+DATABASE_CACHE_SIZE_KIB = 16 * 1024
+DATABASE_MMAP_SIZE = 256 * 1024 * 1024
+DATABASE_CACHED_STATEMENTS = 256  # compiled statements kept per connection
+BULK_INSERT_CHUNK_SIZE = 500
+TRACKS_FETCH_BATCH_SIZE = 1000
+
+# Tag reading constants
+
+TAG_READER_WORKERS = None  # defaults to the number of CPU cores
+CONTENT_HASH_CHUNK_SIZE = 64 * 1024  # bytes hashed from the start and from the end of each file
+TAG_READER_BATCH_SIZE = 100  # files parsed by a worker at once, also the scanner's commit size
+DIRECTORY_CRAWLER_WORKERS = 8  # directories scanned at once, mostly waiting on the file system
+LIBRARY_SCAN_PROGRESS_INTERVAL = 0.1  # seconds between scan progress updates
+LIBRARY_WATCH_DEBOUNCE_INTERVAL = 2000  # ms of quiet after a folder change before it's rescanned
+LIBRARY_WATCH_POLL_INTERVAL = 5 * 60 * 1000  # ms between rescans when folders can't be watched
+
+# Artwork constants
+
+ARTWORK_MEMORY_CACHE_SIZE = 2000  # number of scaled pixmaps kept in memory
+ARTWORK_CACHE_PATH = os.path.join(ROOT, "database/artwork_cache.db")
+ARTWORK_CACHE_MAX_SIZE = 256 * 1024 * 1024  # bytes of thumbnails kept on disk
+ARTWORK_LAST_ACCESS_UPDATE_INTERVAL = 24 * 60 * 60  # seconds, how stale a thumbnail's last access may get on disk
+ARTWORK_PANEL_SIZE = 512  # track info panel artwork
+# track table, queue, group and panel artwork, thumbnails of new tracks are created in these sizes ahead of time
+ARTWORK_THUMBNAIL_SIZES = (20, 42, 50, ARTWORK_PANEL_SIZE)
+ARTWORK_BANNER_HEIGHT = 60  # blurred audio controller background
 
 # Settings constants
 
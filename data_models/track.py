@@ -1,10 +1,9 @@
 import os
-from copy import deepcopy
 from dataclasses import dataclass, field
-from typing import Any
+from typing import Optional
 
 
-@dataclass(eq=False)
+@dataclass(eq=False, slots=True)
 class Track:
     track_id: int
     file_path: str = field(repr=False)
@@ -17,9 +16,13 @@ class Track:
     length: int = field(repr=False)
     size: int = field(repr=False)
     rating: int = field(repr=False, default=0)
-    # artwork_path: str = field(repr=False)
-    artwork_pixmap: Any = field(repr=False, default=None)
     queue_id: int = field(repr=True, default=0)
+    # file fingerprint from the last time the tags were read, used to skip unchanged files when rescanning
+    mtime: Optional[int] = field(repr=False, default=None)  # nanoseconds
+    inode: Optional[int] = field(repr=False, default=None)
+    # size and partial content hash, set when the tags are read to recognize the same file under another path,
+    # not loaded with the rest of the track since nothing displayed needs it
+    content_hash: Optional[str] = field(repr=False, default=None)
 
     def __str__(self):
         return repr(self)
@@ -28,23 +31,29 @@ class Track:
         if not isinstance(other, Track):
             return False
 
-        return self.file_path == other.file_path and self.queue_id == other.queue_id
+        return self.track_id == other.track_id and self.queue_id == other.queue_id
+
+    def __hash__(self):
+        # track_id and queue_id must not change while the track is used as a set element or dict key
+        return hash((self.track_id, self.queue_id))
 
     def __deepcopy__(self, memo):
+        # all fields are immutable, so a shallow copy is enough
         cls = self.__class__
         result = cls.__new__(cls)
         memo[id(self)] = result
-        for k, v in self.__dict__.items():
-            try:
-                setattr(result, k, deepcopy(v, memo))
-            except TypeError:  # cannot deepcopy QPixmap
-                setattr(result, k, v)
+        for name in self.__slots__:
+            setattr(result, name, getattr(self, name))
         return result
 
     @property
     def format(self) -> str:
         return os.path.splitext(self.file_path)[-1]
 
+    @property
+    def folder(self) -> str:
+        return self.file_path.rsplit("/", 1)[0]
+
     @property
     def display_name(self) -> str:
         if self.artist and self.title:
@@ -59,3 +68,18 @@ class Track:
     def is_valid(self) -> bool:
         return os.path.exists(self.file_path)
 
+
+if __name__ == '__main__':
+    import sys
+    import tracemalloc
+
+    track_count = 100_000
+    tracemalloc.start()
+    tracks = [Track(i, f"C:/Music/Artist {i % 500}/Album {i % 2000}/{i:06d} Title.mp3", f"Title {i}",
+                    f"Album {i % 2000}", f"Artist {i % 500}", None, "Rock", 2000 + i % 20, 240, 8_000_000, 0)
+              for i in range(track_count)]
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    print(f"{track_count} tracks: {current / 2 ** 20:.1f} MiB in total, {current / track_count:.0f} bytes per track "
+          f"({sys.getsizeof(tracks[0])} bytes per Track instance without its field values)")
@@ -1,7 +1,9 @@
 from dataclasses import dataclass
-from typing import Optional
+from typing import Optional, TYPE_CHECKING
 
-from PyQt6.QtGui import QPixmap
+if TYPE_CHECKING:
+    # data_models is imported by tag reading processes, which don't load Qt
+    from PyQt6.QtGui import QPixmap
 
 
 @dataclass
@@ -9,4 +11,4 @@ class TrackGroup:
     title: str
     visual_title: str
     tracks_num: int
-    pixmap: Optional[QPixmap] = None
+    pixmap: Optional["QPixmap"] = None
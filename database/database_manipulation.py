@@ -1,28 +1,16 @@
-import os
 import sqlite3
-from sqlite3 import Error
+from typing import Callable, Tuple
 
-from constants import DATABASE_PATH
+from constants import GROUP_OPTIONS
 
 
-def _create_connection() -> None:
-    """ create a database connection to a SQLite database """
-    conn = None
-    try:
-        if not os.path.exists(os.path.dirname(DATABASE_PATH)):
-            os.mkdir(os.path.dirname(DATABASE_PATH))
+def _get_folder_path(file_path: str) -> str:
+    return file_path.rsplit("/", 1)[0]
 
-        conn = sqlite3.connect(DATABASE_PATH)
-    except Error as e:
-        print(e)
-    finally:
-        if conn:
-            conn.close()
 
-
-def _create_tables() -> None:
+def _create_tables(cursor: sqlite3.Cursor) -> None:
     create_tracks_table_query = '''
-    CREATE TABLE "tracks" (
+    CREATE TABLE IF NOT EXISTS "tracks" (
         "track_id"	INTEGER NOT NULL UNIQUE,
         "file_path"	TEXT NOT NULL,
         "title"	NUMERIC,
@@ -37,15 +25,115 @@ def _create_tables() -> None:
         PRIMARY KEY("track_id" AUTOINCREMENT)
     );'''
 
-    conn = sqlite3.connect(DATABASE_PATH)
-    cursor = conn.cursor()
-
     cursor.execute(create_tracks_table_query)
 
-    conn.commit()
-    conn.close()
 
+def _add_folder_column_and_indexes(cursor: sqlite3.Cursor) -> None:
+    """Stores each track's folder so grouping by it doesn't need a per-row function call and indexes
+    every grouping key."""
+    cursor.connection.create_function("get_folder_path", 1, _get_folder_path, deterministic=True)
+    cursor.execute('ALTER TABLE tracks ADD COLUMN "folder" TEXT')
+    cursor.execute("UPDATE tracks SET folder = get_folder_path(file_path)")
+
+    # file_path becomes unique, so duplicates that might've been added before are dropped first
+    cursor.execute("DELETE FROM tracks WHERE track_id NOT IN (SELECT MIN(track_id) FROM tracks GROUP BY file_path)")
+    cursor.execute("CREATE UNIQUE INDEX IF NOT EXISTS idx_tracks_file_path ON tracks (file_path)")
+
+    for group_key in GROUP_OPTIONS:
+        group_key = group_key.lower()
+        cursor.execute(f"CREATE INDEX IF NOT EXISTS idx_tracks_{group_key} ON tracks ({group_key})")
+
+
+def _add_file_fingerprint_columns(cursor: sqlite3.Cursor) -> None:
+    """mtime and inode are compared with the files on disk when rescanning, tracks added before this migration
+    have neither and get their tags read again on the next scan."""
+    cursor.execute('ALTER TABLE tracks ADD COLUMN "mtime" INTEGER')
+    cursor.execute('ALTER TABLE tracks ADD COLUMN "inode" INTEGER')
+
+
+def _create_scan_journal_tables(cursor: sqlite3.Cursor) -> None:
+    """A scan session is journaled until it finishes, so an interrupted scan can be resumed."""
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS "scan_sessions" (
+        "session_id"	INTEGER NOT NULL UNIQUE,
+        "folders"	TEXT NOT NULL,
+        "started"	REAL NOT NULL,
+        "walk_complete"	INTEGER NOT NULL DEFAULT 0,
+        PRIMARY KEY("session_id" AUTOINCREMENT)
+    );''')
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS "scan_journal" (
+        "session_id"	INTEGER NOT NULL,
+        "file_path"	TEXT NOT NULL,
+        "action"	TEXT NOT NULL,
+        "state"	TEXT NOT NULL DEFAULT 'pending',
+        PRIMARY KEY("session_id", "file_path", "action")
+    ) WITHOUT ROWID;''')
+
+
+def _add_content_hash_column(cursor: sqlite3.Cursor) -> None:
+    """Existing tracks have their fingerprints cleared, so the next scan reads them again and stores their hashes."""
+    cursor.execute('ALTER TABLE tracks ADD COLUMN "content_hash" TEXT')
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_tracks_content_hash ON tracks (content_hash)")
+    cursor.execute("UPDATE tracks SET mtime = NULL")
 
-def setup_database() -> None:
-    _create_connection()
-    _create_tables()
+
+def _create_skipped_duplicates_table(cursor: sqlite3.Cursor) -> None:
+    """Files that weren't added because they're copies of tracks in the library, with their fingerprints, so scans
+    don't read them again while they're unchanged."""
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS "skipped_duplicates" (
+        "file_path"	TEXT NOT NULL UNIQUE,
+        "original_file_path"	TEXT NOT NULL,
+        "mtime"	INTEGER,
+        "size"	INTEGER NOT NULL,
+        "inode"	INTEGER,
+        PRIMARY KEY("file_path")
+    ) WITHOUT ROWID;''')
+
+
+# Each migration brings the schema up by one version, the version is stored in PRAGMA user_version.
+MIGRATIONS: Tuple[Callable[[sqlite3.Cursor], None], ...] = (
+    _create_tables,
+    _add_folder_column_and_indexes,
+    _add_file_fingerprint_columns,
+    _create_scan_journal_tables,
+    _add_content_hash_column,
+    _create_skipped_duplicates_table,
+)
+SCHEMA_VERSION = len(MIGRATIONS)
+
+
+def get_schema_version(conn: sqlite3.Connection) -> int:
+    return conn.execute("PRAGMA user_version").fetchone()[0]
+
+
+def setup_database(conn: sqlite3.Connection) -> None:
+    """Brings the database schema up to SCHEMA_VERSION, each migration runs in its own transaction."""
+    for version in range(get_schema_version(conn), SCHEMA_VERSION):
+        cursor = conn.cursor()
+        try:
+            cursor.execute("BEGIN IMMEDIATE")
+            MIGRATIONS[version](cursor)
+            cursor.execute(f"PRAGMA user_version = {version + 1}")
+            conn.commit()
+        except sqlite3.Error:
+            conn.rollback()
+            raise
+
+
+def setup_artwork_cache_database(conn: sqlite3.Connection) -> None:
+    """The artwork cache can always be rebuilt from the audio files, so it has no migrations."""
+    conn.execute('''
+    CREATE TABLE IF NOT EXISTS "thumbnails" (
+        "file_path"	TEXT NOT NULL,
+        "mtime"	INTEGER NOT NULL,
+        "size"	INTEGER NOT NULL,
+        "variant"	TEXT NOT NULL,
+        "data"	BLOB,
+        "byte_size"	INTEGER NOT NULL DEFAULT 0,
+        "last_access"	REAL NOT NULL,
+        PRIMARY KEY("file_path", "size", "variant")
+    );''')
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_thumbnails_last_access ON thumbnails (last_access)")
+    conn.commit()
@@ -1,4 +1,4 @@
-from typing import List
+from typing import List, Optional
 
 from PIL import UnidentifiedImageError
 from PyQt6.QtCore import QUrl, pyqtSignal, pyqtSlot, QSize, QPoint, Qt, QThread
@@ -6,15 +6,17 @@ from PyQt6.QtGui import QBrush, QPixmap, QPainter, QIcon, QFont, QPaintEvent, QW
 from PyQt6.QtWidgets import QHBoxLayout, QLabel, QVBoxLayout, QSizePolicy, QFrame, QSpacerItem, QWidget
 
 from constants import (AUDIO_CONTROLLER_HEIGHT, ROOT, CONTROLLER_BUTTON_HEIGHT, CONTROLLER_BUTTON_WIDTH,
-                       STARTING_AUDIO_VOLUME, DARK_AUDIO_CONTROLLER_COLOR, LIGHT_AUDIO_CONTROLLER_COLOR)
+                       STARTING_AUDIO_VOLUME, DARK_AUDIO_CONTROLLER_COLOR, LIGHT_AUDIO_CONTROLLER_COLOR,
+                       ARTWORK_PANEL_SIZE, ARTWORK_BANNER_HEIGHT)
 from data_models import Track
 from gui.audio import AudioPlayer, AudioQueue, AudioUserAction, AudioRepeatMode
 from gui.dialogs import TrackNotFoundDialog
 from gui.star import StarWidget
 from gui.widgets import MarqueeLabel, SeekSlider, VolumeSlider
+from repositories import ArtworkRepository
 from utils import (get_formatted_time, format_player_position_to_seconds, TrackNotInQueueError,
-                   get_embedded_artwork_pixmap, get_blurred_pixmap, change_icon_color, HoverButton, format_seconds,
-                   get_default_artwork_pixmap, ImageDownloader)
+                   get_banner_pixmap, change_icon_color, HoverButton, format_seconds, get_default_artwork_pixmap,
+                   ImageDownloader)
 
 
 class AudioController(QFrame):
@@ -36,6 +38,7 @@ class AudioController(QFrame):
         self.setFocusPolicy(Qt.FocusPolicy.NoFocus)
 
         self._is_dark_mode_enabled = None
+        self.artwork_repository = ArtworkRepository()
         self.image_downloader = ImageDownloader()
         self.image_download_thread = QThread()
         self.image_downloader.moveToThread(self.image_download_thread)
@@ -298,18 +301,16 @@ class AudioController(QFrame):
         self.repaint()
         self.background_pixmap_updated.emit(get_default_artwork_pixmap("album"))
 
-    def _set_custom_background_pixmap(self, pixmap: QPixmap) -> None:
+    def _set_custom_background_pixmap(self, pixmap: QPixmap, banner_pixmap: Optional[QPixmap] = None) -> None:
         if pixmap.isNull():
             self._set_background_to_default()
         else:
             self.background_pixmap_updated.emit(pixmap)
 
-            pixmap = get_blurred_pixmap(pixmap)
-            start_y = int(pixmap.height() // 1.5)
-            new_height = 60
-            pixmap = pixmap.copy(0, start_y, pixmap.width(), new_height)
+            if banner_pixmap is None:
+                banner_pixmap = get_banner_pixmap(pixmap, ARTWORK_BANNER_HEIGHT)
 
-            self.background_pixmap = pixmap
+            self.background_pixmap = banner_pixmap
             self.set_dark_mode_enabled(False)
             self.repaint()
 
@@ -327,12 +328,12 @@ class AudioController(QFrame):
             self._set_background_to_default()
             return
 
-        pixmap = get_embedded_artwork_pixmap(track.file_path)
+        pixmap = self.artwork_repository.get_artwork_pixmap(track.file_path, ARTWORK_PANEL_SIZE)
         if not pixmap:
             self._set_background_to_default()
             self.start_image_download_thread(track)
         else:
-            self._set_custom_background_pixmap(pixmap)
+            self._set_custom_background_pixmap(pixmap, self.artwork_repository.get_banner_pixmap(track.file_path))
 
     def start_image_download_thread(self, track: Track) -> None:
         if self.image_download_thread.isRunning():
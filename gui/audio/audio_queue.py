@@ -84,6 +84,7 @@ class AudioQueue(QObject, metaclass=QtSingleton):
         self.queue_updated.emit(self.get_queue())
 
     def enqueue_last(self, tracks: List[Track]) -> None:
+        tracks = copy.deepcopy(tracks)
         for track in tracks:
             track.queue_id = self._queue_id_counter
             self._queue_id_counter += 1
@@ -20,8 +20,7 @@ class AddFilesDialog(QFileDialog):
                                               filter=f"Music Files ({extension_string})")
         if file_paths:
             tracks = TracksRepository.convert_file_paths_to_tracks(file_paths)
-            CachedTracksRepository().add_new_tracks(tracks)
-            self.cached_tracks_repository.delete_cache()
-            self.cached_tracks_repository.load_cache()
+            # the library index is patched by add_new_tracks, so the cache doesn't need to be reloaded
+            self.cached_tracks_repository.add_new_tracks(tracks)
             self.added_tracks.emit(tracks)
         self.done(0)
@@ -74,12 +74,9 @@ class DeleteTracksDialog(QDialog):
         self.dialog_layout.addWidget(self.main_frame)
 
     def delete_tracks(self) -> None:
-        for track in self._tracks:
-            if self.delete_from_library_button.isChecked():
-                self.cached_tracks_repository.delete_track_by("file_path", track.file_path)
-
-            elif self.delete_from_computer_button.isChecked():
-                self.cached_tracks_repository.delete_track_by("file_path", track.file_path)
+        # removing tracks from the library is done in bulk by the receiver of TrackTableView.tracks_deleted
+        if self.delete_from_computer_button.isChecked():
+            for track in self._tracks:
                 if os.path.isfile(track.file_path):
                     os.remove(track.file_path)
 
@@ -2,21 +2,24 @@ from __future__ import annotations
 
 import os
 import sys
-from collections import defaultdict
 from typing import List, Tuple, Union
 
-from PyQt6.QtCore import pyqtSignal, Qt
+from PyQt6.QtCore import pyqtSignal, Qt, QThread, pyqtSlot
 from PyQt6.QtWidgets import (QPushButton, QScrollArea, QTreeWidgetItem, QTreeWidget, QSpacerItem, QHBoxLayout,
-                             QVBoxLayout, QDialog, QFrame, QGridLayout, QWidget, QLabel, QSizePolicy, QApplication)
+                             QVBoxLayout, QDialog, QFrame, QGridLayout, QWidget, QLabel, QSizePolicy, QApplication,
+                             QProgressBar)
 
 from config import Config
-from constants import DEFAULT_CONFIG_PATH, SUPPORTED_AUDIO_FORMATS
-from repositories import CachedTracksRepository
+from constants import DEFAULT_CONFIG_PATH
+from data_models import Track
+from gui.library import LibraryScanner, ScanProgress
+from repositories import ArtworkRepository, CachedTracksRepository
 from utils import delete_grid_layout_items, PathCheckbox, QHLine
 
 
 class ScanFoldersDialog(QDialog):
     added_tracks = pyqtSignal(list)
+    updated_tracks = pyqtSignal(list)
     removed_tracks = pyqtSignal(list)
 
     # noinspection PyTypeChecker
@@ -35,6 +38,20 @@ class ScanFoldersDialog(QDialog):
         self.main_layout.setContentsMargins(5, 5, 5, 5)
 
         self.cached_tracks_repository = CachedTracksRepository()
+        self._tracks_added: List[Track] = []
+        self._tracks_updated: List[Track] = []
+        self._tracks_removed: List[Track] = []
+
+        self.library_scanner = LibraryScanner()
+        self.library_scan_thread = QThread()
+        self.library_scanner.moveToThread(self.library_scan_thread)
+        self.library_scan_thread.started.connect(self.library_scanner.scan)
+        self.library_scanner.progress_updated.connect(self.update_scan_progress)
+        self.library_scanner.tracks_added.connect(self._scanner_added_tracks)
+        self.library_scanner.tracks_updated.connect(self._scanner_updated_tracks)
+        self.library_scanner.tracks_removed.connect(self._scanner_removed_tracks)
+        self.library_scanner.scan_finished.connect(self.library_scan_thread.quit)
+        self.library_scanner.scan_finished.connect(self._scan_finished)
 
         self.main_frame = QFrame()
         self.main_frame.setObjectName("main_frame")
@@ -57,11 +74,19 @@ class ScanFoldersDialog(QDialog):
         self.selected_folders_scroll_area.setHorizontalScrollBarPolicy(Qt.ScrollBarPolicy.ScrollBarAlwaysOff)
         self.proceed_button = QPushButton("Proceed")
         self.proceed_button.clicked.connect(self.proceed_button_clicked)
+        self.pause_button = QPushButton("Pause")
+        self.pause_button.clicked.connect(self.pause_button_clicked)
+        self.pause_button.hide()
         self.close_button = QPushButton("Close")
-        self.close_button.clicked.connect(lambda: self.done(0))
+        self.close_button.clicked.connect(self.reject)
+
+        self.scan_progress_bar = QProgressBar()
+        self.scan_progress_bar.hide()
+        self.scan_progress_label = QLabel()
 
         self.choose_folders_button.setAutoDefault(False)
         self.proceed_button.setAutoDefault(False)
+        self.pause_button.setAutoDefault(False)
         self.close_button.setAutoDefault(False)
 
         self.main_layout.addWidget(self.main_frame)
@@ -77,9 +102,12 @@ class ScanFoldersDialog(QDialog):
 
         self.bottom_horizontal_widget = QWidget()
         self.bottom_horizontal_layout = QHBoxLayout(self.bottom_horizontal_widget)
-        self.bottom_horizontal_layout.setAlignment(Qt.AlignmentFlag.AlignRight)
         self.bottom_horizontal_layout.setContentsMargins(0, 0, 0, 0)
+        self.bottom_horizontal_layout.addWidget(self.scan_progress_label)
+        self.bottom_horizontal_layout.addStretch()
+        self.bottom_horizontal_layout.addWidget(self.scan_progress_bar)
         self.bottom_horizontal_layout.addWidget(self.proceed_button)
+        self.bottom_horizontal_layout.addWidget(self.pause_button)
         self.bottom_horizontal_layout.addWidget(self.close_button)
 
         self.vertical_layout.addWidget(self.top_horizontal_widget)
@@ -94,32 +122,83 @@ class ScanFoldersDialog(QDialog):
         # must return None, not int
         super().exec()
 
+    def reject(self) -> None:
+        if self.library_scan_thread.isRunning():
+            # the dialog is closed once the scanner stops
+            self.library_scanner.cancel()
+            self.close_button.setEnabled(False)
+            return
+        super().reject()
+
     def proceed_button_clicked(self) -> None:
         config = Config()
         config.load(DEFAULT_CONFIG_PATH)
         config.set_setting("preselected_folders", self.checked_folders)
         config.save(DEFAULT_CONFIG_PATH)
 
-        found_file_paths = defaultdict(list)
-        for folder in self.checked_folders:
-            for root, _, files in os.walk("C:" + folder):
-                for file in files:
-                    if os.path.splitext(file)[-1] in SUPPORTED_AUDIO_FORMATS:
-                        found_file_paths[root.replace("\\", "/")].append(
-                            f"{root}/{file}".replace("\\", "/").replace("//", "/"))
-
-        tracks_added, tracks_removed = [], []
-
-        for dir_root, file_paths in found_file_paths.items():
-            added, removed = self.cached_tracks_repository.update_tracks_by_folder(dir_root, file_paths)
-            tracks_added += added
-            tracks_removed += removed
-
-        self.cached_tracks_repository.delete_cache()
-        self.cached_tracks_repository.load_cache()
-
-        self.added_tracks.emit(tracks_added)
-        self.removed_tracks.emit(tracks_removed)
+        self._tracks_added, self._tracks_updated, self._tracks_removed = [], [], []
+        self.choose_folders_button.setEnabled(False)
+        self.proceed_button.hide()
+        self.pause_button.setText("Pause")
+        self.pause_button.show()
+        self.close_button.setText("Cancel")
+        self.scan_progress_bar.setRange(0, 0)
+        self.scan_progress_bar.show()
+        self.scan_progress_label.setText("Looking for files...")
+
+        # files that were missing may be back
+        ArtworkRepository().forget_missing_files()
+        self.library_scanner.set_folders(self.checked_folders)
+        self.library_scan_thread.start()
+
+    def pause_button_clicked(self) -> None:
+        if self.library_scanner.is_paused:
+            self.library_scanner.resume()
+            self.pause_button.setText("Pause")
+        else:
+            self.library_scanner.pause()
+            self.pause_button.setText("Resume")
+
+    @pyqtSlot(ScanProgress)
+    def update_scan_progress(self, progress: ScanProgress) -> None:
+        if progress.to_parse:
+            self.scan_progress_bar.setRange(0, progress.to_parse)
+            self.scan_progress_bar.setValue(progress.parsed)
+            self.scan_progress_label.setText(f"Read {progress.parsed} of {progress.to_parse} new or changed files "
+                                             f"({progress.files_per_second:.0f} files/s)"
+                                             + (f", {progress.duplicates} duplicates skipped"
+                                                if progress.duplicates else ""))
+        else:
+            self.scan_progress_label.setText(f"Found {progress.discovered} files, {progress.unchanged} unchanged")
+
+    @pyqtSlot(list)
+    def _scanner_added_tracks(self, tracks: List[Track]) -> None:
+        self.cached_tracks_repository.add_to_cache(tracks)
+        self._tracks_added += tracks
+
+    @pyqtSlot(list)
+    def _scanner_updated_tracks(self, tracks: List[Track]) -> None:
+        self.cached_tracks_repository.update_in_cache(tracks)
+        self._tracks_updated += tracks
+
+    @pyqtSlot(list)
+    def _scanner_removed_tracks(self, tracks: List[Track]) -> None:
+        self.cached_tracks_repository.remove_from_cache(tracks)
+        self._tracks_removed += tracks
+
+    @pyqtSlot(bool)
+    def _scan_finished(self, _: bool) -> None:
+        self.added_tracks.emit(self._tracks_added)
+        self.updated_tracks.emit(self._tracks_updated)
+        self.removed_tracks.emit(self._tracks_removed)
+
+        self.choose_folders_button.setEnabled(True)
+        self.proceed_button.show()
+        self.pause_button.hide()
+        self.close_button.setText("Close")
+        self.close_button.setEnabled(True)
+        self.scan_progress_bar.hide()
+        self.scan_progress_label.clear()
 
         config = Config()
         config.load(DEFAULT_CONFIG_PATH)
@@ -0,0 +1,3 @@
+from .artwork_extractor import ArtworkExtractor
+from .library_scanner import LibraryScanner, ScanProgress
+from .library_watcher import LibraryWatcher
@@ -0,0 +1,29 @@
+import threading
+
+from PyQt6.QtCore import QObject, pyqtSlot
+
+from repositories import ArtworkRepository
+
+
+class ArtworkExtractor(QObject):
+    """Writes thumbnails of imported tracks to the artwork cache, so they're displayed without reading the audio
+    files. Meant to be moved to its own QThread and fed tracks once their metadata is committed. Only one
+    artwork is decoded at a time and nothing is kept in memory, however many tracks are imported."""
+
+    def __init__(self):
+        super().__init__()
+        self._cancelled = threading.Event()
+
+    def cancel(self) -> None:
+        self._cancelled.set()
+
+    @pyqtSlot(list)
+    def extract(self, tracks: list) -> None:
+        artwork_repository = ArtworkRepository()
+        try:
+            for track in tracks:
+                if self._cancelled.is_set():
+                    return
+                artwork_repository.cache_thumbnails(track.file_path)
+        finally:
+            ArtworkRepository.close_thread_connection()
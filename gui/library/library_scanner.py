@@ -0,0 +1,269 @@
+import itertools
+import os
+import threading
+import time
+from dataclasses import dataclass, replace
+from typing import Dict, Iterable, Iterator, List, Set, Tuple, Optional, Union
+
+from PyQt6.QtCore import QObject, pyqtSignal
+
+from constants import LIBRARY_SCAN_PROGRESS_INTERVAL
+from data_models import Track
+from repositories import ScanJournalRepository, ScanSession, TracksRepository
+from utils import DirectoryCrawler, TagReader, normalize_path
+
+# mtime (nanoseconds), size, inode
+FileFingerprint = Tuple[Optional[int], int, Optional[int]]
+
+
+@dataclass
+class ScanProgress:
+    discovered: int = 0
+    unchanged: int = 0
+    to_parse: int = 0
+    parsed: int = 0
+    inserted: int = 0
+    updated: int = 0
+    removed: int = 0
+    duplicates: int = 0  # new files that are copies of files already in the library
+    elapsed: float = 0.0  # seconds
+
+    @property
+    def files_per_second(self) -> float:
+        return self.parsed / self.elapsed if self.elapsed else 0.0
+
+
+class LibraryScanner(QObject):
+    """Scans folders for audio files and brings the database in line with them. Meant to be moved to its own
+    QThread, its scan slot connected to the thread's started signal. Changes are committed in batches and
+    emitted so the GUI thread can update its caches, pause, resume and cancel can be called from any thread.
+
+    Files whose mtime, size and inode match the database are skipped without being opened, only new and
+    modified files have their tags read and tracks whose files are gone are deleted. The same goes for copies of
+    tracks that were skipped as duplicates, while their originals exist. With use_journal, the work
+    left is journaled, so a scan of the same folders that was interrupted after its walk picks up where it
+    stopped without walking again."""
+    progress_updated = pyqtSignal(ScanProgress)
+    tracks_added = pyqtSignal(list)
+    tracks_updated = pyqtSignal(list)
+    tracks_removed = pyqtSignal(list)
+    directories_crawled = pyqtSignal(list)  # every directory under the folders, once they're walked
+    scan_finished = pyqtSignal(bool)  # whether the scan was cancelled
+
+    def __init__(self, use_journal: bool = True):
+        super().__init__()
+        self.folders: List[str] = []
+        self.scan_journal = ScanJournalRepository() if use_journal else None
+
+        self._cancelled = threading.Event()
+        self._resumed = threading.Event()
+        self._resumed.set()
+        self._last_progress_time = 0.0
+
+    def set_folders(self, folders: List[str]) -> None:
+        self.folders = [normalize_path(folder) for folder in folders]
+
+    def cancel(self) -> None:
+        self._cancelled.set()
+        self._resumed.set()
+
+    def pause(self) -> None:
+        self._resumed.clear()
+
+    def resume(self) -> None:
+        self._resumed.set()
+
+    @property
+    def is_paused(self) -> bool:
+        return not self._resumed.is_set()
+
+    def scan(self) -> None:
+        try:
+            self._scan()
+        finally:
+            # every scan runs on a new thread, which would leave its connection open
+            TracksRepository.close_thread_connection()
+
+    def _scan(self) -> None:
+        self._cancelled.clear()
+        self._resumed.set()
+        progress = ScanProgress()
+        start = time.perf_counter()
+
+        tracks_repository = TracksRepository()
+        files_in_database = tracks_repository.get_file_fingerprints()
+        content_hashes = tracks_repository.get_content_hashes()
+        skipped_duplicates = tracks_repository.get_skipped_duplicates()
+        files_on_disk: Dict[str, FileFingerprint] = {}
+        removed_paths: List[str] = []
+
+        session = self._get_unfinished_session()
+        if session is not None and session.walk_complete:
+            # the folders were walked to the end before, only the journaled work is left
+            print(f"Resuming scan of {', '.join(self.folders)}")
+            to_parse = self.scan_journal.get_pending_paths(session.session_id, ScanJournalRepository.PARSE)
+            progress.to_parse = len(to_parse)
+            removed_paths = [file_path for file_path in self.scan_journal.get_pending_paths(
+                             session.session_id, ScanJournalRepository.REMOVE) if not os.path.exists(file_path)]
+        else:
+            journaled_paths = []
+            if session is not None:
+                # files the interrupted walk got to are parsed right away, the walk itself only stats files
+                print(f"Resuming scan of {', '.join(self.folders)}")
+                journaled_paths = self.scan_journal.get_pending_paths(session.session_id,
+                                                                      ScanJournalRepository.PARSE)
+                progress.to_parse = len(journaled_paths)
+            elif self.scan_journal is not None:
+                session = self.scan_journal.start_session(self.folders)
+            # tags of new and modified files are read while the folders are still being walked
+            to_parse = itertools.chain(journaled_paths, self._discover_changed_files(
+                files_on_disk, files_in_database, skipped_duplicates, removed_paths, set(journaled_paths), session,
+                progress, start))
+
+        for tracks in TagReader().read_tracks(to_parse):
+            if self._should_stop():
+                break
+            progress.parsed += len(tracks)
+
+            new_tracks, modified_tracks = [], []
+            for track in tracks:
+                if track.file_path in files_in_database:
+                    track.track_id = files_in_database[track.file_path][0]
+                    modified_tracks.append(track)
+                else:
+                    new_tracks.append(track)
+            unique_tracks = tracks_repository.skip_duplicates(new_tracks, content_hashes)
+            progress.duplicates += len(new_tracks) - len(unique_tracks)
+            new_tracks = unique_tracks
+
+            # each batch is committed on its own, a batch that's committed but not yet marked as done in the
+            # journal is read again on resume and updates its tracks instead of adding them twice
+            if new_tracks:
+                tracks_repository.add_tracks(new_tracks)
+                progress.inserted += len(new_tracks)
+                self.tracks_added.emit(new_tracks)
+            if modified_tracks:
+                self._update_content_hashes(content_hashes, modified_tracks,
+                                            tracks_repository.get_content_hashes_by_ids(
+                                                track.track_id for track in modified_tracks))
+                tracks_repository.update_tracks_metadata(modified_tracks)
+                progress.updated += len(modified_tracks)
+                self.tracks_updated.emit(modified_tracks)
+            if session is not None:
+                self.scan_journal.mark_done(session.session_id, ScanJournalRepository.PARSE,
+                                            [track.file_path for track in tracks])
+            self._update_progress(progress, start)
+
+        to_remove = [files_in_database[file_path][0] for file_path in removed_paths
+                     if file_path in files_in_database]
+        if to_remove and not self._should_stop():
+            tracks_to_remove = tracks_repository.get_tracks_by_ids(to_remove)
+            tracks_repository.delete_tracks_bulk(tracks_to_remove)
+            progress.removed += len(tracks_to_remove)
+            self.tracks_removed.emit(tracks_to_remove)
+
+        if session is not None and not self._cancelled.is_set():
+            self.scan_journal.finish_session(session.session_id)
+
+        self._update_progress(progress, start, force=True)
+        self.scan_finished.emit(self._cancelled.is_set())
+
+    def _get_unfinished_session(self) -> Optional[ScanSession]:
+        if self.scan_journal is None:
+            return None
+        session = self.scan_journal.get_unfinished_session()
+        if session is None or session.folders != self.folders:
+            return None
+        return session
+
+    def _discover_changed_files(self, files_on_disk: Dict[str, FileFingerprint],
+                                files_in_database: Dict[str, Tuple[int, Optional[int], int, Optional[int]]],
+                                skipped_duplicates: Dict[str, Tuple[str, Optional[int], int, Optional[int]]],
+                                removed_paths: List[str], journaled_paths: Set[str], session: Optional[ScanSession],
+                                progress: ScanProgress, start: float) -> Iterator[str]:
+        """Yields paths of new and modified files as the folders are crawled, fingerprints of every file found are
+        collected in files_on_disk. Files are only stat'ed, none are opened. Once the walk is done, paths of
+        vanished files are collected in removed_paths and vanished skipped duplicates are forgotten. Files in
+        journaled_paths are already queued for parsing.
+
+        Paths are journaled before they're yielded, so the journal has everything left to do once the walk is
+        marked as complete."""
+        directories = []
+        for folder, entries in DirectoryCrawler().crawl(self.folders):
+            if self._should_stop():
+                return
+            directories.append(folder)
+
+            changed_paths = []
+            for entry in entries:
+                stat = entry.stat()
+                file_path = f"{folder.rstrip('/')}/{entry.name}"
+                fingerprint = files_on_disk[file_path] = (stat.st_mtime_ns, stat.st_size, stat.st_ino)
+                progress.discovered += 1
+
+                skipped_duplicate = skipped_duplicates.get(file_path)
+                if self._is_unchanged(fingerprint, files_in_database.get(file_path)) or (
+                        self._is_unchanged(fingerprint, skipped_duplicate)
+                        and skipped_duplicate[0] in files_in_database and os.path.exists(skipped_duplicate[0])):
+                    progress.unchanged += 1
+                elif file_path not in journaled_paths:
+                    changed_paths.append(file_path)
+            progress.to_parse += len(changed_paths)
+            self._update_progress(progress, start)
+
+            if changed_paths and session is not None:
+                self.scan_journal.add_paths(session.session_id, ScanJournalRepository.PARSE, changed_paths)
+            yield from changed_paths
+
+        if self._should_stop():
+            return
+        self.directories_crawled.emit(directories)
+        removed_paths += self._get_removed_paths(files_on_disk, files_in_database)
+        TracksRepository().delete_skipped_duplicates(self._get_removed_paths(files_on_disk, skipped_duplicates))
+        if session is not None:
+            self.scan_journal.add_paths(session.session_id, ScanJournalRepository.REMOVE, removed_paths)
+            self.scan_journal.set_walk_complete(session.session_id)
+
+    @staticmethod
+    def _is_unchanged(fingerprint: FileFingerprint,
+                      in_database: Optional[Tuple[Union[int, str], Optional[int], int, Optional[int]]]) -> bool:
+        if in_database is None:
+            return False
+        mtime, size, inode = fingerprint
+        _, database_mtime, database_size, database_inode = in_database
+        return (mtime == database_mtime and size == database_size
+                and not (inode and database_inode and inode != database_inode))
+
+    def _get_removed_paths(self, files_on_disk: Dict[str, FileFingerprint],
+                           files_in_database: Dict[str, tuple]) -> List[str]:
+        """Returns paths from files_in_database under the scanned folders whose files are gone. Folders that can't be
+        reached at all are left alone."""
+        scanned_prefixes = tuple(f"{folder.rstrip('/')}/" for folder in self.folders if os.path.isdir(folder))
+        return [file_path for file_path in files_in_database
+                if file_path.startswith(scanned_prefixes) and file_path not in files_on_disk]
+
+    @staticmethod
+    def _update_content_hashes(content_hashes: Dict[str, str], modified_tracks: Iterable[Track],
+                               old_content_hashes: Dict[int, Optional[str]]) -> None:
+        """Points content_hashes at the new content of modified tracks, so new files are checked for duplicates
+        against what the tracks contain now."""
+        for track in modified_tracks:
+            old_content_hash = old_content_hashes.get(track.track_id)
+            if old_content_hash == track.content_hash:
+                continue
+            if old_content_hash is not None and content_hashes.get(old_content_hash) == track.file_path:
+                del content_hashes[old_content_hash]
+            if track.content_hash is not None:
+                content_hashes.setdefault(track.content_hash, track.file_path)
+
+    def _should_stop(self) -> bool:
+        self._resumed.wait()
+        return self._cancelled.is_set()
+
+    def _update_progress(self, progress: ScanProgress, start: float, force: bool = False) -> None:
+        now = time.perf_counter()
+        if not force and now - self._last_progress_time < LIBRARY_SCAN_PROGRESS_INTERVAL:
+            return
+        self._last_progress_time = now
+        progress.elapsed = now - start
+        self.progress_updated.emit(replace(progress))
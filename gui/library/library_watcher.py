@@ -0,0 +1,130 @@
+import os
+from typing import List, Set
+
+from PyQt6.QtCore import QObject, QFileSystemWatcher, QThread, QTimer, pyqtSignal, pyqtSlot
+
+from constants import LIBRARY_WATCH_DEBOUNCE_INTERVAL, LIBRARY_WATCH_POLL_INTERVAL
+from gui.library.library_scanner import LibraryScanner
+from repositories import ArtworkRepository, CachedTracksRepository
+from utils import normalize_path
+
+
+class LibraryWatcher(QObject):
+    """Keeps the library in sync with the watched folders. Directory change notifications from
+    QFileSystemWatcher are debounced and coalesced, then only the changed directories are rescanned on a
+    background thread. If the system can't watch every directory, all folders are rescanned periodically
+    instead, which is cheap since unchanged files are skipped by their fingerprints.
+
+    Directories to watch are the ones the scanner walks, so the folders are never crawled on the GUI thread. The
+    folders are scanned once when watching starts, which also picks up changes made while they weren't watched."""
+    tracks_added = pyqtSignal(list)
+    tracks_updated = pyqtSignal(list)
+    tracks_removed = pyqtSignal(list)
+
+    def __init__(self, *args):
+        super().__init__(*args)
+        self.folders: List[str] = []
+        self.cached_tracks_repository = CachedTracksRepository()
+
+        self._file_system_watcher = QFileSystemWatcher(self)
+        self._file_system_watcher.directoryChanged.connect(self._directory_changed)
+        self._changed_directories: Set[str] = set()
+
+        self._debounce_timer = QTimer(self)
+        self._debounce_timer.setSingleShot(True)
+        self._debounce_timer.setInterval(LIBRARY_WATCH_DEBOUNCE_INTERVAL)
+        self._debounce_timer.timeout.connect(self._rescan_changed_directories)
+
+        self._poll_timer = QTimer(self)
+        self._poll_timer.setInterval(LIBRARY_WATCH_POLL_INTERVAL)
+        self._poll_timer.timeout.connect(lambda: self._queue_directories(self.folders))
+
+        # watcher scans are small and redone on the next change anyway, so they aren't journaled
+        self.library_scanner = LibraryScanner(use_journal=False)
+        self.library_scan_thread = QThread(self)
+        self.library_scanner.moveToThread(self.library_scan_thread)
+        self.library_scan_thread.started.connect(self.library_scanner.scan)
+        self.library_scanner.tracks_added.connect(self._scanner_added_tracks)
+        self.library_scanner.tracks_updated.connect(self._scanner_updated_tracks)
+        self.library_scanner.tracks_removed.connect(self._scanner_removed_tracks)
+        self.library_scanner.directories_crawled.connect(self._watch_directories)
+        self.library_scanner.scan_finished.connect(self.library_scan_thread.quit)
+        self.library_scan_thread.finished.connect(self._rescan_changed_directories)
+
+    @property
+    def is_polling(self) -> bool:
+        return self._poll_timer.isActive()
+
+    def start(self, folders: List[str]) -> None:
+        self.stop()
+        self.folders = [normalize_path(folder) for folder in folders]
+        self._queue_directories(self.folders)
+
+    def stop(self) -> None:
+        self.folders = []
+        self._debounce_timer.stop()
+        self._poll_timer.stop()
+        self._remove_watched_paths()
+        self._changed_directories.clear()
+        if self.library_scan_thread.isRunning():
+            self.library_scanner.cancel()
+
+    def _remove_watched_paths(self) -> None:
+        watched_paths = self._file_system_watcher.directories()
+        if watched_paths:
+            self._file_system_watcher.removePaths(watched_paths)
+
+    @pyqtSlot(list)
+    def _watch_directories(self, directories: List[str]) -> None:
+        """New subdirectories are watched once the rescan of their parent walks them, removed ones are dropped by
+        QFileSystemWatcher itself."""
+        if not self.folders or self.is_polling:
+            return
+        watched_paths = set(self._file_system_watcher.directories())
+        new_directories = [directory for directory in directories if directory not in watched_paths]
+        if new_directories and self._file_system_watcher.addPaths(new_directories):
+            print("Could not watch every library directory, falling back to polling")
+            self._remove_watched_paths()
+            self._poll_timer.start()
+
+    @pyqtSlot(str)
+    def _directory_changed(self, directory: str) -> None:
+        self._queue_directories([normalize_path(directory)])
+
+    def _queue_directories(self, directories: List[str]) -> None:
+        self._changed_directories.update(directories)
+        self._debounce_timer.start()
+
+    @pyqtSlot()
+    def _rescan_changed_directories(self) -> None:
+        if not self._changed_directories or self.library_scan_thread.isRunning():
+            # a running scan restarts this once its thread finishes
+            return
+
+        # a removed directory is rescanned through its parent, which also sees the change
+        directories = {directory if os.path.isdir(directory) else os.path.dirname(directory)
+                       for directory in self._changed_directories}
+        self._changed_directories.clear()
+        # directories are scanned recursively, so ones inside another changed directory would be scanned twice
+        directories = [directory for directory in directories
+                       if not any(directory.startswith(f"{other}/") for other in directories)]
+
+        # files that were missing may be back
+        ArtworkRepository().forget_missing_files()
+        self.library_scanner.set_folders(directories)
+        self.library_scan_thread.start()
+
+    @pyqtSlot(list)
+    def _scanner_added_tracks(self, tracks: list) -> None:
+        self.cached_tracks_repository.add_to_cache(tracks)
+        self.tracks_added.emit(tracks)
+
+    @pyqtSlot(list)
+    def _scanner_updated_tracks(self, tracks: list) -> None:
+        self.cached_tracks_repository.update_in_cache(tracks)
+        self.tracks_updated.emit(tracks)
+
+    @pyqtSlot(list)
+    def _scanner_removed_tracks(self, tracks: list) -> None:
+        self.cached_tracks_repository.remove_from_cache(tracks)
+        self.tracks_removed.emit(tracks)
@@ -1,14 +1,16 @@
 from typing import List
 
-from PyQt6.QtCore import Qt, pyqtSlot, QSignalBlocker
-from PyQt6.QtGui import QAction
+from PyQt6.QtCore import Qt, pyqtSlot, pyqtSignal, QSignalBlocker, QThread
+from PyQt6.QtGui import QAction, QCloseEvent
 from PyQt6.QtWidgets import QMenuBar, QWidget, QMenu, QMainWindow, QVBoxLayout
 
+from config import Config
 from constants import (APPLICATION_NAME, MAIN_WINDOW_Y, MAIN_PANEL_MIN_WIDTH, PANEL_MIN_WIDTH, MAIN_WINDOW_X,
-                       MAIN_WINDOW_WIDTH, MAIN_WINDOW_HEIGHT)
+                       MAIN_WINDOW_WIDTH, MAIN_WINDOW_HEIGHT, DEFAULT_CONFIG_PATH)
 from data_models import Track
 from gui.audio import AudioController, AudioQueue
 from gui.dialogs import AddFilesDialog, ScanFoldersDialog
+from gui.library import ArtworkExtractor, LibraryWatcher
 from gui.panels import GroupPanel, MainPanel, QueuePanel
 from gui.widgets import HeaderMenuWidget, StatusBar
 from repositories import CachedTracksRepository
@@ -16,10 +18,20 @@ from utils import FixedHorizontalSplitter
 
 
 class MainWindow(QMainWindow):
+    artwork_extraction_requested = pyqtSignal(list)
+
     def __init__(self):
         super().__init__()
         self.scan_folders_dialog = ScanFoldersDialog()
         self.add_files_dialog = AddFilesDialog()
+        self.library_watcher = LibraryWatcher(self)
+
+        # thumbnails of imported tracks are created once their metadata is committed, away from the GUI thread
+        self.artwork_extractor = ArtworkExtractor()
+        self.artwork_extraction_thread = QThread(self)
+        self.artwork_extractor.moveToThread(self.artwork_extraction_thread)
+        self.artwork_extraction_requested.connect(self.artwork_extractor.extract)
+        self.artwork_extraction_thread.start()
 
         self.cached_tracks_repository = CachedTracksRepository()
         self.cached_tracks_repository.load_cache()
@@ -35,6 +47,7 @@ class MainWindow(QMainWindow):
         super().show()
         self._setup_signals()
         self.group_panel.refresh_groups()
+        self._update_library_watcher()
 
     def _setup_ui(self) -> None:
         self.central_widget = QWidget(self)
@@ -55,10 +68,17 @@ class MainWindow(QMainWindow):
         add_files_action = QAction("&Add Files to Library", self)
         add_files_action.triggered.connect(lambda: self.add_files_dialog.exec())
         scan_folders_action = QAction("&Scan Folders for New Files", self)
-        scan_folders_action.triggered.connect(lambda: self.scan_folders_dialog.exec())
+        scan_folders_action.triggered.connect(self._scan_folders)
+        config = Config()
+        config.load(DEFAULT_CONFIG_PATH)
+        self.watch_folders_action = QAction("&Watch Folders for Changes", self)
+        self.watch_folders_action.setCheckable(True)
+        self.watch_folders_action.setChecked(config.get_setting("watch_folders", False))
+        self.watch_folders_action.toggled.connect(self._watch_folders_toggled)
 
         file_menu.addAction(add_files_action)
         file_menu.addAction(scan_folders_action)
+        file_menu.addAction(self.watch_folders_action)
 
         self.menu_bar.addMenu(file_menu)
 
@@ -162,12 +182,31 @@ class MainWindow(QMainWindow):
         self.audio_controller.playing_track_rating_updated.connect(_track_rating_updated_from_audio_controller)
 
         self.scan_folders_dialog.added_tracks.connect(self._added_tracks_to_database)
+        self.scan_folders_dialog.updated_tracks.connect(self._library_tracks_updated)
         self.scan_folders_dialog.removed_tracks.connect(self._removed_tracks_from_database)
 
         self.add_files_dialog.added_tracks.connect(self._added_tracks_to_database)
 
+        self.scan_folders_dialog.added_tracks.connect(self.artwork_extraction_requested)
+        self.scan_folders_dialog.updated_tracks.connect(self.artwork_extraction_requested)
+        self.add_files_dialog.added_tracks.connect(self.artwork_extraction_requested)
+        self.library_watcher.tracks_added.connect(self.artwork_extraction_requested)
+        self.library_watcher.tracks_updated.connect(self.artwork_extraction_requested)
+
+        self.library_watcher.tracks_added.connect(self._library_tracks_added)
+        self.library_watcher.tracks_updated.connect(self._library_tracks_updated)
+        self.library_watcher.tracks_removed.connect(self._removed_tracks_from_database)
+
         self.audio_controller.background_pixmap_updated.connect(self.queue_panel.set_track_pixmap)
 
+    def closeEvent(self, event: QCloseEvent) -> None:
+        self.library_watcher.stop()
+        self.library_watcher.library_scan_thread.wait()
+        self.artwork_extractor.cancel()
+        self.artwork_extraction_thread.quit()
+        self.artwork_extraction_thread.wait()
+        super().closeEvent(event)
+
     def queue_next(self, tracks_to_queue: List[Track]) -> None:
         self.audio_controller.enqueue_next(tracks_to_queue)
         self.status_bar.update_queue_info(self.audio_controller.get_tracks())
@@ -187,7 +226,49 @@ class MainWindow(QMainWindow):
         self.group_panel.refresh_groups()
 
     def _removed_tracks_from_database(self, tracks: List[Track]) -> None:
-        ...
+        if not tracks:
+            return
+        self.main_panel.remove_tracks(tracks)
+        self.group_panel.refresh_groups()
+
+    def _library_tracks_added(self, tracks: List[Track]) -> None:
+        # groups are served from the library index, which the watcher has already patched
+        self.group_panel.refresh_groups()
+        self.main_panel.add_tracks([track for track in tracks if self.group_panel.is_in_last_selected_group(track)])
+
+    def _library_tracks_updated(self, tracks: List[Track]) -> None:
+        if not tracks:
+            return
+        self.group_panel.refresh_groups()
+        # tracks whose tags changed may have moved to another group
+        self.main_panel.remove_tracks([track for track in tracks
+                                       if not self.group_panel.is_in_last_selected_group(track)])
+        self.main_panel.update_tracks([track for track in tracks
+                                       if self.group_panel.is_in_last_selected_group(track)])
+
+    def _scan_folders(self) -> None:
+        # a watcher scan running next to the dialog's would insert the same new files, so it's stopped until the
+        # dialog is closed
+        self.library_watcher.stop()
+        self.library_watcher.library_scan_thread.wait()
+        self.scan_folders_dialog.exec()
+        self._update_library_watcher()
+
+    def _watch_folders_toggled(self, checked: bool) -> None:
+        config = Config()
+        config.load(DEFAULT_CONFIG_PATH)
+        config.set_setting("watch_folders", checked)
+        config.save(DEFAULT_CONFIG_PATH)
+        self._update_library_watcher()
+
+    def _update_library_watcher(self) -> None:
+        if not self.watch_folders_action.isChecked():
+            self.library_watcher.stop()
+            return
+
+        config = Config()
+        config.load(DEFAULT_CONFIG_PATH)
+        self.library_watcher.start(config.get_setting("preselected_folders", []))
 
     def _player_stopped(self) -> None:
         self.main_panel.stop_playing()
@@ -1,13 +1,12 @@
-from typing import List, Optional
+from typing import List
 
 from PyQt6.QtCore import pyqtSlot, pyqtSignal, Qt, QSize
-from PyQt6.QtGui import QPixmap
 from PyQt6.QtWidgets import QVBoxLayout, QFrame, QHeaderView, QAbstractItemView
 
 from constants import PANEL_MIN_WIDTH, GROUP_OPTIONS
 from gui.views import GroupTableView
 from repositories import CachedTracksRepository
-from utils import get_embedded_artwork_pixmap, get_default_artwork_pixmap
+from utils import get_default_artwork_pixmap
 from data_models import Track, TrackGroup
 
 
@@ -100,14 +99,6 @@ class GroupPanel(QFrame):
         self.group_table_view.group_double_clicked.connect(self.group_double_clicked.emit)
 
     def _load_groups(self, key: int = 0) -> None:
-        def get_group_pixmap(group_key: str, group_title: str) -> Optional[QPixmap]:
-            tracks = self.cached_tracks_repository.get_tracks_by(group_key, group_title)  # TODO should be optimized
-            artwork_pixmap = get_embedded_artwork_pixmap(tracks[0].file_path)
-
-            if not artwork_pixmap or artwork_pixmap.isNull():
-                artwork_pixmap = get_default_artwork_pixmap(group_key)
-            return artwork_pixmap
-
         group_key: str = GROUP_OPTIONS[key].lower()
         self.groups: List[TrackGroup] = [TrackGroup("all",
                                                     f"All {group_key.capitalize()}s",
@@ -116,8 +107,6 @@ class GroupPanel(QFrame):
                                                     )]
 
         for title, count in self.cached_tracks_repository.get_track_counts_grouped_by_key(group_key):
-            pixmap = get_group_pixmap(group_key, title)
-
             if title is None and group_key == "album":
                 visual_title = "[Empty]"
             elif title is None:
@@ -127,7 +116,8 @@ class GroupPanel(QFrame):
             else:
                 visual_title = title
 
-            self.groups.append(TrackGroup(title, visual_title, count, pixmap))
+            # pixmap is loaded lazily by the view once the group is displayed
+            self.groups.append(TrackGroup(title, visual_title, count))
 
         self.group_table_view.set_groups(self.groups)
 
@@ -150,3 +140,10 @@ class GroupPanel(QFrame):
         tracks = self.cached_tracks_repository.get_tracks_by(self.group_table_view.last_group_key,
                                                              self.group_table_view.last_group_title)
         return tracks
+
+    def is_in_last_selected_group(self, track: Track) -> bool:
+        if not self.group_table_view.last_group_key or not self.group_table_view.last_group_title:
+            return False
+        if self.group_table_view.last_group_title == "all":
+            return True
+        return getattr(track, self.group_table_view.last_group_key.lower()) == self.group_table_view.last_group_title
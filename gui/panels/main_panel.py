@@ -55,6 +55,18 @@ class MainPanel(QFrame):
         self._display_key, self._display_value = key_value_tuple
         self.track_view_widget.set_tracks(tracks)
 
+    @pyqtSlot(list)
+    def add_tracks(self, tracks: List[Track]) -> None:
+        self.track_view_widget.add_tracks(tracks)
+
+    @pyqtSlot(list)
+    def update_tracks(self, tracks: List[Track]) -> None:
+        self.track_view_widget.update_tracks(tracks)
+
+    @pyqtSlot(list)
+    def remove_tracks(self, tracks: List[Track]) -> None:
+        self.track_view_widget.remove_tracks(tracks)
+
     @pyqtSlot(Track)
     def set_playing_track(self, track: Track) -> None:
         self.track_view_widget.set_playing_track(track)
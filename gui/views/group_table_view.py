@@ -1,14 +1,14 @@
 from typing import List, Any, Union, Optional
 
 from PyQt6.QtCore import QModelIndex, pyqtSignal, pyqtSlot, QAbstractTableModel, Qt
-from PyQt6.QtGui import QPen, QBrush, QPainter, QFont, QFocusEvent, QPalette, QColor
+from PyQt6.QtGui import QPen, QBrush, QPainter, QFont, QFocusEvent, QPalette, QColor, QPixmap
 from PyQt6.QtWidgets import (QTableView, QWidget, QVBoxLayout, QStyledItemDelegate, QStyle,
                              QStyleOptionViewItem, QApplication, QAbstractItemView)
 
 from constants import SELECTION_QCOLOR, LOST_FOCUS_QCOLOR
 from data_models import TrackGroup
-from repositories import CachedTracksRepository
-from utils import ElidedLabel
+from repositories import CachedTracksRepository, ArtworkRepository
+from utils import ElidedLabel, get_default_artwork_pixmap
 
 
 class GroupTableView(QTableView):
@@ -95,7 +95,23 @@ class GroupTableModel(QAbstractTableModel):
 
         if role == Qt.ItemDataRole.DecorationRole:
             if not index.column():
-                return self.groups[index.row()].pixmap
+                group = self.groups[index.row()]
+                if group.pixmap is None:
+                    group.pixmap = self._load_group_pixmap(group)
+                return group.pixmap
+
+    def _load_group_pixmap(self, group: TrackGroup) -> QPixmap:
+        """Group artwork is loaded only once the group's row is displayed."""
+        group_key = self.table_view.group_key
+        tracks = CachedTracksRepository().get_tracks_by(group_key, group.title)
+        artwork_pixmap = None
+        if tracks:
+            # scaled in device pixels, the returned pixmap has the view's device pixel ratio set
+            artwork_pixmap = ArtworkRepository().get_artwork_pixmap(tracks[0].file_path,
+                                                                    self.table_view.iconSize().width(),
+                                                                    self.table_view.devicePixelRatioF())
+
+        return artwork_pixmap or get_default_artwork_pixmap(group_key)
 
     def rowCount(self, index: QModelIndex = QModelIndex) -> int:
         return len(self.groups)
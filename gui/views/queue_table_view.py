@@ -7,8 +7,8 @@ from PyQt6.QtWidgets import (QTableView, QWidget, QVBoxLayout, QHBoxLayout, QLab
 
 from constants import SELECTION_QCOLOR, LOST_FOCUS_QCOLOR, ROOT
 from data_models import Track
-from utils import (ElidedLabel, get_embedded_artwork_pixmap, get_formatted_time_in_mins, get_default_artwork_pixmap,
-                   change_pixmap_color)
+from repositories import ArtworkRepository
+from utils import ElidedLabel, get_formatted_time_in_mins, get_default_artwork_pixmap, change_pixmap_color
 
 
 class QueueTableView(QTableView):
@@ -27,7 +27,7 @@ class QueueTableView(QTableView):
         self.setPalette(palette)
 
         self.doubleClicked.connect(lambda index: self.track_double_clicked.emit(self._table_model.tracks[index.row()]))
-        self._table_model.dataChanged.connect(lambda: self._handle_scrolling())
+        self._table_model.modelReset.connect(lambda: self._handle_scrolling())
 
     def set_tracks(self, tracks: List[Track]) -> None:
         self._table_model.set_tracks(tracks)
@@ -45,23 +45,30 @@ class QueueTableView(QTableView):
 
     def set_playing_track(self, track: Optional[Track]) -> None:
         self._table_delegate.is_paused = True if track is None else False
+        self._update_playing_row()
         self._playing_track_index = self._table_model.tracks.index(track) if track in self._table_model.tracks else None
         self._table_delegate.set_playing_track_index(self._playing_track_index)
+        self._update_playing_row()
         self._handle_scrolling()
 
     def set_paused(self) -> None:
         self._table_delegate.is_stopped = False
         self._table_delegate.is_paused = True
-        self.viewport().repaint()
+        self._update_playing_row()
 
     def set_unpaused(self) -> None:
         self._table_delegate.is_stopped = False
         self._table_delegate.is_paused = False
-        self.viewport().repaint()
+        self._update_playing_row()
 
     def stop_playing(self):
         self._table_delegate.is_stopped = True
-        self.viewport().repaint()
+        self._update_playing_row()
+
+    def _update_playing_row(self) -> None:
+        """Repaints the track info cell of the playing row, where the speaker icon is drawn."""
+        if self._playing_track_index is not None and self._playing_track_index >= 0:
+            self.viewport().update(self.visualRect(self._table_model.index(self._playing_track_index, 1)))
 
     def focusInEvent(self, event: QFocusEvent) -> None:
         if QApplication.mouseButtons() & Qt.MouseButton.LeftButton:
@@ -75,10 +82,13 @@ class QueueTableView(QTableView):
 class QueueTableModel(QAbstractTableModel):
     def __init__(self, parent: QTableView = None):
         super().__init__(parent)
+        self._table_view = parent
         self.tracks: List[Track] = []
 
         self.loaded_tracks_num = 0
-        self.loaded_pixmap_mapping = {}
+        self._artwork_repository = ArtworkRepository()
+        self._default_artwork_pixmap = get_default_artwork_pixmap("album")
+        self._scaled_default_artwork_pixmap: Optional[QPixmap] = None
 
     def data(self, index: QModelIndex, role: Qt.ItemDataRole = Qt.ItemDataRole.DisplayRole) -> Any:
         if not self.tracks:
@@ -89,14 +99,24 @@ class QueueTableModel(QAbstractTableModel):
 
         if role == Qt.ItemDataRole.DecorationRole:
             if not index.column():
-                if index.row() not in self.loaded_pixmap_mapping:
-                    artwork_pixmap = get_embedded_artwork_pixmap(self.tracks[index.row()].file_path)
-                    if not artwork_pixmap or artwork_pixmap.isNull():
-                        artwork_pixmap = get_default_artwork_pixmap("album")
-                    self.loaded_pixmap_mapping[index.row()] = artwork_pixmap
-                else:
-                    artwork_pixmap = self.loaded_pixmap_mapping[index.row()]
-                return artwork_pixmap
+                # artwork fills the cell without its 2 pixel border, it's scaled to that size here once
+                size = min(self._table_view.columnWidth(0), self._table_view.rowHeight(index.row())) - 4
+                device_pixel_ratio = self._table_view.devicePixelRatioF()
+                artwork_pixmap = self._artwork_repository.get_artwork_pixmap(self.tracks[index.row()].file_path,
+                                                                             size, device_pixel_ratio)
+                return artwork_pixmap or self._get_default_artwork_pixmap(size, device_pixel_ratio)
+
+    def _get_default_artwork_pixmap(self, size: int, device_pixel_ratio: float) -> QPixmap:
+        pixmap = self._scaled_default_artwork_pixmap
+        if (pixmap is None or pixmap.devicePixelRatio() != device_pixel_ratio or
+                pixmap.width() != round(size * device_pixel_ratio)):
+            device_size = round(size * device_pixel_ratio)
+            pixmap = self._default_artwork_pixmap.scaled(device_size, device_size,
+                                                         Qt.AspectRatioMode.IgnoreAspectRatio,
+                                                         Qt.TransformationMode.SmoothTransformation)
+            pixmap.setDevicePixelRatio(device_pixel_ratio)
+            self._scaled_default_artwork_pixmap = pixmap
+        return pixmap
 
     def rowCount(self, index: QModelIndex = QModelIndex) -> int:
         return len(self.tracks)
@@ -105,13 +125,9 @@ class QueueTableModel(QAbstractTableModel):
         return 2
 
     def set_tracks(self, tracks: List[Track]) -> None:
-        self.loaded_pixmap_mapping = {}
-        self.layoutAboutToBeChanged.emit()
+        self.beginResetModel()
         self.tracks = tracks
-        self.layoutChanged.emit()
-        self.dataChanged.emit(self.createIndex(0, 0),
-                              self.createIndex(self.rowCount(),
-                                               self.columnCount()))
+        self.endResetModel()
 
 
 class QueueTableItemDelegate(QStyledItemDelegate):
@@ -155,16 +171,14 @@ class QueueTableItemDelegate(QStyledItemDelegate):
         else:
             painter.setBrush(QBrush(Qt.GlobalColor.white))
 
-        if index.data(Qt.ItemDataRole.DecorationRole):
-            decoration_value = index.data(Qt.ItemDataRole.DecorationRole)
+        pixmap = index.data(Qt.ItemDataRole.DecorationRole)
+        if pixmap:
             rect = option.rect
             rect.setRect(rect.left() + 2, rect.top() + 2,
                          rect.width() - 4, rect.height() - 4)
-
-            pixmap = decoration_value.scaled(rect.width(), rect.width(),
-                                             Qt.AspectRatioMode.IgnoreAspectRatio,
-                                             Qt.TransformationMode.SmoothTransformation)
-            painter.drawPixmap(rect, pixmap)
+            # the model scales artwork to this rect, so it's drawn at its own size
+            painter.drawPixmap(QStyle.alignedRect(option.direction, Qt.AlignmentFlag.AlignCenter,
+                                                  pixmap.deviceIndependentSize().toSize(), rect).topLeft(), pixmap)
 
         if index.column() == 1:
             main_part_rect = option.rect
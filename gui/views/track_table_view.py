@@ -1,8 +1,12 @@
 from __future__ import annotations
 
+import bisect
 import sys
 import typing
-from typing import List, Optional, Any, Union, Dict
+from collections import OrderedDict
+from itertools import accumulate, compress, groupby
+from operator import attrgetter
+from typing import List, Optional, Any, Union, Dict, Set, Tuple, Iterable
 
 from PyQt6.QtCore import (QModelIndex, pyqtSignal, pyqtSlot, QSize, QAbstractItemModel, QRect, QAbstractTableModel, Qt,
                           QSortFilterProxyModel)
@@ -13,12 +17,13 @@ from PyQt6.QtWidgets import (QApplication, QTableView, QAbstractItemView, QHeade
                              QStyledItemDelegate, QMenu, QVBoxLayout, QPushButton, QWidget, QFrame, QMainWindow,
                              QAbstractScrollArea, QDialog, QStyleOptionHeaderV2, QProxyStyle)
 
-from constants import MAIN_PANEL_COLUMN_NAMES, SELECTION_QCOLOR, LOST_FOCUS_QCOLOR, ROOT
+from constants import (MAIN_PANEL_COLUMN_NAMES, MAIN_PANEL_FETCH_SIZE, MAIN_PANEL_ELIDED_TEXT_CACHE_SIZE,
+                       SELECTION_QCOLOR, LOST_FOCUS_QCOLOR, ROOT)
 from data_models import Track
 from gui.dialogs import DeleteTracksDialog
 from gui.star import StarDelegate, StarRating
-from repositories import TracksRepository
-from utils import get_formatted_time_in_mins, change_pixmap_color
+from repositories import TracksRepository, CachedTracksRepository, ArtworkRepository
+from utils import TrackSearchIndex, get_formatted_time_in_mins, change_pixmap_color
 
 
 class TrackTableView(QTableView):
@@ -43,8 +48,7 @@ class TrackTableView(QTableView):
         self._table_model = TrackTableModel(self)
         self._table_delegate = TrackTableItemDelegate(self)
         self._star_delegate = StarDelegate(self)
-        self._star_delegate.track_rating_updated.connect(
-            lambda index, rating: self.track_rating_updated.emit(self._table_model.tracks[index], rating))
+        self._star_delegate.track_rating_updated.connect(self._star_delegate_rating_updated)
         self._table_header = TrackTableHeader(Qt.Orientation.Horizontal, self)
         self._table_header.sectionClicked.connect(self.sort_by_column)
         self.clicked.connect(self.row_clicked)
@@ -80,7 +84,6 @@ class TrackTableView(QTableView):
         self.track_clicked.emit(track)
 
     def sort_by_column(self, logical_index: int, order: Optional[Qt.SortOrder] = None) -> None:
-        self._table_delegate.clear_cache()
         if logical_index not in {0, 1}:
             if self._sort_order == Qt.SortOrder.AscendingOrder:
                 self._sort_order = Qt.SortOrder.DescendingOrder
@@ -100,11 +103,16 @@ class TrackTableView(QTableView):
             self.clearSelection()
             self.sortByColumn(logical_index, self._sort_order)
 
+    @property
+    def artwork_size(self) -> int:
+        """Size of the artwork in the first column, the cell without its 1 pixel border."""
+        return min(self.columnWidth(0), self.verticalHeader().defaultSectionSize()) - 2
+
     def get_playing_track_index(self) -> Optional[int]:
-        try:
-            return self._table_model.tracks.index(self.playing_track)
-        except ValueError:
-            return None
+        return self.get_track_row(self.playing_track)
+
+    def get_track_row(self, track: Optional[Track]) -> Optional[int]:
+        return self._table_model.get_row(track)
 
     def _setup_context_menu(self):
         self.context_menu = QMenu(self)
@@ -220,21 +228,60 @@ class TrackTableView(QTableView):
         d = DeleteTracksDialog(selected_tracks)
         code = d.exec()
         if code == QDialog.DialogCode.Accepted:
-            self._table_model.delete_tracks(selected_tracks)
+            self.remove_tracks(selected_tracks)
             self.tracks_deleted.emit(selected_tracks)
 
         self.selectRow(sorted(selected_track_indexes)[0])
 
     @pyqtSlot(list)
     def set_tracks(self, tracks: List[Track]) -> None:
+        self._close_rating_editors()
+        self.clearSelection()
+        self._proxy_sort_model.set_tracks(tracks)
+        # tracks may have been set again because their tags changed
+        self._table_delegate.clear_cache()
+        self.new_tracks_set.emit()
+        self.sort_by_column(self._table_header.sortIndicatorSection(), self._sort_order)
+
+    def _close_rating_editors(self) -> None:
         for index in self.selectedIndexes():
             if index.column() == self.rating_column:
                 self._star_delegate.commit_and_close_editor(index)
+
+    @pyqtSlot(list)
+    def add_tracks(self, tracks: List[Track]) -> None:
+        """Shows tracks added to the library in their sorted places, without resetting the view."""
+        if not tracks:
+            return
+        self._table_model.rearrange_tracks(self._proxy_sort_model.add_tracks(tracks))
+        self.set_playing_track_index(self.get_track_row(self.playing_track))
+
+    @pyqtSlot(list)
+    def update_tracks(self, tracks: List[Track]) -> None:
+        """Replaces tracks whose tags were read again, ones that aren't shown yet are added."""
+        updated_tracks = [track for track in tracks if self._proxy_sort_model.contains(track)]
+        if updated_tracks:
+            self._close_rating_editors()
+            # elided texts are cached by track, which stays equal to the updated one
+            self._table_delegate.clear_cache()
+            self._table_model.rearrange_tracks(self._proxy_sort_model.update_tracks(updated_tracks))
+            self.set_playing_track_index(self.get_track_row(self.playing_track))
+        self.add_tracks([track for track in tracks if not self._proxy_sort_model.contains(track)])
+
+    @pyqtSlot(list)
+    def remove_tracks(self, tracks: List[Track]) -> None:
+        self._table_model.delete_tracks(tracks)
+        self._proxy_sort_model.remove_tracks(tracks)
+        self.set_playing_track_index(self.get_track_row(self.playing_track))
+
+    @pyqtSlot(str)
+    def set_filter_text(self, text: str) -> None:
+        """Shows only the tracks whose artist, title, album, genre or composer has words starting with the words of
+        the text."""
+        self._close_rating_editors()
         self.clearSelection()
-        self._table_model.set_tracks(tracks)
-        self._table_delegate.set_tracks(tracks)
-        self.new_tracks_set.emit()
-        self.sort_by_column(self._table_header.sortIndicatorSection(), self._sort_order)
+        self._proxy_sort_model.set_filter_text(text)
+        self.scrollToTop()
 
     @pyqtSlot(int)
     def set_playing_track_index(self, index: Optional[int]) -> None:
@@ -255,9 +302,16 @@ class TrackTableView(QTableView):
     def set_stopped(self) -> None:
         self._table_model.set_stopped()
 
+    @pyqtSlot(int, float)
+    def _star_delegate_rating_updated(self, row: int, rating: float) -> None:
+        track = self._table_model.tracks[row]
+        self._proxy_sort_model.track_updated(track, "rating")
+        self.track_rating_updated.emit(track, rating)
+
     @pyqtSlot(Track, float)
     def update_track_rating(self, track: Track, rating: float) -> None:
         self._table_model.update_track_rating(track, rating)
+        self._proxy_sort_model.track_updated(track, "rating")
 
     def focusInEvent(self, event: QFocusEvent) -> None:
         # It's important to clear selection for better visuals, but to do it before opening new editor
@@ -277,6 +331,13 @@ class TrackTableView(QTableView):
 
 
 class TrackTableSortFilterProxyModel(QSortFilterProxyModel):
+    """Sorts and filters the tracks, the source model is given the tracks to display in their order. Sort keys are
+    computed once per column for a set of tracks and sorted orders are cached per column and order, so sorting by
+    a column again only rearranges the tracks. Filtering keeps the sorted order, it just leaves out tracks that
+    don't match the filter text, which is looked up in the library's search index. Tracks added, updated or removed
+    later are applied to the cached sort keys and ascending orders, descending orders are their reverse."""
+    NUMERIC_SORT_KEYS = ("year", "length", "rating")
+
     def __init__(self, table_view: TrackTableView):
         super().__init__(table_view)
         self._sort_order = Qt.SortOrder.AscendingOrder
@@ -284,42 +345,185 @@ class TrackTableSortFilterProxyModel(QSortFilterProxyModel):
         self._source_model: Optional[TrackTableModel] = None
         self._table_view = table_view
 
+        # tracks in the order they were set in, cached sorted orders are rows of this list
+        self._unsorted_tracks: List[Track] = []
+        self._unsorted_track_ids: List[int] = []
+        self._unsorted_rows: Dict[int, int] = {}  # track_id, row
+        self._sort_keys: Dict[str, List[Any]] = {}
+        self._sorted_rows: Dict[Tuple[str, Qt.SortOrder], List[int]] = {}
+        self._applied_sort: Optional[Tuple[str, Qt.SortOrder]] = None
+
+        self._filter_text = ""
+        self._matching_track_ids: Optional[Set[int]] = None
+
     def setSourceModel(self, source_model: TrackTableModel) -> None:
         self._source_model = source_model
-        self._source_model.dataChanged.connect(self.dataChanged.emit)
         self._source_model.layoutAboutToBeChanged.connect(self.layoutAboutToBeChanged.emit)
         self._source_model.layoutChanged.connect(self.layoutChanged.emit)
         super().setSourceModel(source_model)
 
+    def set_tracks(self, tracks: List[Track]) -> None:
+        self._reset_caches(tracks)
+        self._source_model.set_tracks(self._get_displayed_tracks())
+
     def sort(self, column: int, sort_order: Qt.SortOrder = Qt.SortOrder) -> None:
         if column not in (0, 1):
             self.sort_key = MAIN_PANEL_COLUMN_NAMES[column].lower()
             if self.sort_key == "time":
                 self.sort_key = "length"
-            self._source_model.layoutAboutToBeChanged.emit()
-            if sort_order == Qt.SortOrder.AscendingOrder:
-                self._source_model.tracks.sort(key=self._sort_func)
-            else:
-                self._source_model.tracks.sort(key=self._sort_func, reverse=True)
+            self._applied_sort = (self.sort_key, sort_order)
+            self._source_model.rearrange_tracks(self._get_displayed_tracks())
 
             self._table_view._tracks = self._source_model.tracks
             self._source_model.set_playing_track_index(self._table_view.get_playing_track_index())
 
-        self.layoutChanged.emit()
-        self.dataChanged.emit(QModelIndex(), QModelIndex())
-
-    def _sort_func(self, track: Track) -> Any:
-        output = getattr(track, self.sort_key)
-        if output is None and self.sort_key not in ("year", "length"):
-            return ""
-        elif output is None:
-            return 0
-        elif self.sort_key in ("year", "length"):
-            if isinstance(output, str):
-                output = output.lower()
-            return output
+    def set_filter_text(self, text: str) -> None:
+        if text == self._filter_text:
+            return
+        narrows = TrackSearchIndex.narrows(text, self._filter_text)
+        matching_track_ids = self._matching_track_ids
+        self._filter_text = text
+        self._update_matching_track_ids()
+        if self._matching_track_ids is matching_track_ids:
+            return
+        if narrows:
+            # typing usually extends the filter text, then only the displayed tracks can still match
+            tracks = self._source_model.tracks
+            track_ids = map(attrgetter("track_id"), tracks)
+            self._source_model.rearrange_tracks(list(compress(tracks, map(self._matching_track_ids.__contains__,
+                                                                          track_ids))))
+        else:
+            self._source_model.rearrange_tracks(self._get_displayed_tracks())
+        self._source_model.set_playing_track_index(self._table_view.get_playing_track_index())
+
+    def add_tracks(self, tracks: List[Track]) -> List[Track]:
+        """Returns the tracks to display with the new ones in their places."""
+        first_row = len(self._unsorted_tracks)
+        self._unsorted_tracks += tracks
+        self._unsorted_track_ids += [track.track_id for track in tracks]
+        self._unsorted_rows.update(zip(self._unsorted_track_ids[first_row:], range(first_row, len(tracks) + first_row)))
+        for sort_key, sort_keys in self._sort_keys.items():
+            sort_keys += self._to_sort_keys(sort_key, tracks)
+        self._insert_sorted_rows(range(first_row, len(self._unsorted_tracks)))
+        self._update_matching_track_ids()
+        return self._get_displayed_tracks()
+
+    def update_tracks(self, tracks: List[Track]) -> List[Track]:
+        """Replaces tracks whose tags were read again, returns the tracks to display in their new order."""
+        rows = [self._unsorted_rows[track.track_id] for track in tracks]
+        for row, track in zip(rows, tracks):
+            self._unsorted_tracks[row] = track
+        for sort_key, sort_keys in self._sort_keys.items():
+            for row, value in zip(rows, self._to_sort_keys(sort_key, tracks)):
+                sort_keys[row] = value
+        rows = set(rows)
+        for sorted_rows in self._sorted_rows.values():
+            sorted_rows[:] = [row for row in sorted_rows if row not in rows]
+        self._insert_sorted_rows(rows)
+        self._update_matching_track_ids()
+        return self._get_displayed_tracks()
+
+    def remove_tracks(self, tracks: List[Track]) -> None:
+        """Has to be called when tracks are removed from the source model's list."""
+        is_kept = [True] * len(self._unsorted_tracks)
+        for track in tracks:
+            row = self._unsorted_rows.get(track.track_id)
+            if row is not None:
+                is_kept[row] = False
+        if all(is_kept):
+            return
+        kept_rows = list(compress(range(len(is_kept)), is_kept))
+        # rows of the kept tracks move up by the number of removed rows above them
+        new_rows = list(accumulate(is_kept, initial=0))
+
+        self._unsorted_tracks = list(map(self._unsorted_tracks.__getitem__, kept_rows))
+        self._unsorted_track_ids = list(map(self._unsorted_track_ids.__getitem__, kept_rows))
+        self._unsorted_rows = dict(zip(self._unsorted_track_ids, range(len(kept_rows))))
+        self._sort_keys = {sort_key: list(map(sort_keys.__getitem__, kept_rows))
+                           for sort_key, sort_keys in self._sort_keys.items()}
+        self._sorted_rows = {(sort_key, sort_order): list(map(new_rows.__getitem__,
+                                                              compress(sorted_rows, map(is_kept.__getitem__,
+                                                                                        sorted_rows))))
+                             for (sort_key, sort_order), sorted_rows in self._sorted_rows.items()
+                             if sort_order == Qt.SortOrder.AscendingOrder}
+
+    def contains(self, track: Track) -> bool:
+        return track.track_id in self._unsorted_rows
+
+    def track_updated(self, track: Track, sort_key: str) -> None:
+        """Replaces a track whose sort_key value changed, sorted orders by other columns stay valid."""
+        row = self._unsorted_rows.get(track.track_id)
+        if row is None:
+            return
+        self._unsorted_tracks[row] = track
+        self._sort_keys.pop(sort_key, None)
+        self._sorted_rows.pop((sort_key, Qt.SortOrder.AscendingOrder), None)
+        self._sorted_rows.pop((sort_key, Qt.SortOrder.DescendingOrder), None)
+
+    def _reset_caches(self, tracks: List[Track]) -> None:
+        self._unsorted_tracks = list(tracks)
+        self._unsorted_track_ids = [track.track_id for track in tracks]
+        self._unsorted_rows = dict(zip(self._unsorted_track_ids, range(len(tracks))))
+        self._sort_keys = {}
+        self._sorted_rows = {}
+        self._update_matching_track_ids()
+
+    def _update_matching_track_ids(self) -> None:
+        if not self._filter_text.strip():
+            self._matching_track_ids = None
+            return
+        self._matching_track_ids = CachedTracksRepository().search_index.search(self._filter_text)
+
+    def _get_displayed_tracks(self) -> List[Track]:
+        if self._applied_sort is not None:
+            rows = self._get_sorted_rows(*self._applied_sort)
+        elif self._matching_track_ids is not None:
+            rows = range(len(self._unsorted_tracks))
         else:
-            return str(output).lower()
+            return list(self._unsorted_tracks)
+
+        if self._matching_track_ids is not None:
+            # filtered with iterators implemented in C, tracks are only looked at if they match
+            track_ids = map(self._unsorted_track_ids.__getitem__, rows)
+            rows = compress(rows, map(self._matching_track_ids.__contains__, track_ids))
+        return list(map(self._unsorted_tracks.__getitem__, rows))
+
+    def _get_sorted_rows(self, sort_key: str, sort_order: Qt.SortOrder) -> List[int]:
+        """Ascending orders are sorted by sort key and then by row, so rows can be inserted into them later."""
+        if (sort_key, sort_order) in self._sorted_rows:
+            return self._sorted_rows[(sort_key, sort_order)]
+
+        if sort_order == Qt.SortOrder.DescendingOrder:
+            sorted_rows = self._get_sorted_rows(sort_key, Qt.SortOrder.AscendingOrder)[::-1]
+        else:
+            sort_keys = self._get_sort_keys(sort_key)
+            sorted_rows = sorted(range(len(sort_keys)), key=sort_keys.__getitem__)
+        self._sorted_rows[(sort_key, sort_order)] = sorted_rows
+        return sorted_rows
+
+    def _insert_sorted_rows(self, rows: Iterable[int]) -> None:
+        """Inserts rows whose sort keys are set into the ascending orders, descending orders are dropped and
+        reversed from them again when needed."""
+        for sort_key, sort_order in list(self._sorted_rows):
+            sorted_rows = self._sorted_rows[(sort_key, sort_order)]
+            if sort_order == Qt.SortOrder.DescendingOrder or sort_key not in self._sort_keys:
+                del self._sorted_rows[(sort_key, sort_order)]
+                continue
+            sort_keys = self._sort_keys[sort_key]
+            for row in rows:
+                bisect.insort(sorted_rows, row, key=lambda sorted_row: (sort_keys[sorted_row], sorted_row))
+
+    def _get_sort_keys(self, sort_key: str) -> List[Any]:
+        if sort_key not in self._sort_keys:
+            self._sort_keys[sort_key] = self._to_sort_keys(sort_key, self._unsorted_tracks)
+        return self._sort_keys[sort_key]
+
+    def _to_sort_keys(self, sort_key: str, tracks: List[Track]) -> List[Any]:
+        """Casefolded strings, or numbers with -1 for missing values, so they compare without any conversions."""
+        values = (getattr(track, sort_key) for track in tracks)
+        if sort_key in self.NUMERIC_SORT_KEYS:
+            return [value if isinstance(value, (int, float)) else -1 for value in values]
+        return ["" if value is None else str(value).casefold() for value in values]
 
     def data(self, index: QModelIndex, role: Qt.ItemDataRole = Qt.ItemDataRole.DisplayRole) -> Any:
         return self.sourceModel().data(index, role)
@@ -330,10 +534,16 @@ class TrackTableModel(QAbstractTableModel):
         super().__init__(parent)
         self._table_view: TrackTableView = parent
         self.tracks: List[Track] = []
+        # only the first rows are shown at first, more are added by fetchMore as the view is scrolled
+        self._loaded_rows = 0
         self.is_paused = True
         self.is_stopped = True
         self.playing_track_index: Optional[int] = None
         self.playing_track: Optional[Track] = None
+        self._artwork_repository = ArtworkRepository()
+        # rows change on every layout change (sorting, new tracks), so the lookup is rebuilt lazily afterwards
+        self._track_rows: Optional[Dict[int, int]] = None  # track_id, row
+        self.layoutAboutToBeChanged.connect(self._invalidate_track_rows)
 
         self._speaker_pixmap_width = 16
         self._speaker_pixmap_height = 12
@@ -359,6 +569,7 @@ class TrackTableModel(QAbstractTableModel):
     def set_tracks(self, tracks: List[Track]) -> None:
         self.layoutAboutToBeChanged.emit()
         self.tracks = tracks
+        self._loaded_rows = min(len(tracks), MAIN_PANEL_FETCH_SIZE)
         self.layoutChanged.emit()
 
     def data(self, index: QModelIndex, role: Qt.ItemDataRole = Qt.ItemDataRole.DisplayRole) -> Any:
@@ -371,13 +582,9 @@ class TrackTableModel(QAbstractTableModel):
         if role == Qt.ItemDataRole.DecorationRole:
             if index.column() == 0:
                 track = self.tracks[index.row()]
-                artwork_pixmap: Optional[QPixmap] = track.artwork_pixmap  # todo cache this
-                if not artwork_pixmap or artwork_pixmap.isNull():
-                    return None
-                return artwork_pixmap.scaled(self._table_view.columnWidth(index.column()),
-                                             self._table_view.columnWidth(index.column()),
-                                             Qt.AspectRatioMode.KeepAspectRatio,
-                                             Qt.TransformationMode.SmoothTransformation)
+                return self._artwork_repository.get_artwork_pixmap(track.file_path,
+                                                                   self._table_view.artwork_size,
+                                                                   self._table_view.devicePixelRatioF())
             elif index.column() == 1:
                 if self.playing_track_index is None or self.is_stopped:
                     return None
@@ -399,8 +606,29 @@ class TrackTableModel(QAbstractTableModel):
 
             return getattr(self.tracks[index.row()], value) if value else None
 
+    def get_row(self, track: Optional[Track]) -> Optional[int]:
+        if track is None:
+            return None
+        if self._track_rows is None:
+            self._track_rows = dict(zip(map(attrgetter("track_id"), self.tracks), range(len(self.tracks))))
+        return self._track_rows.get(track.track_id)
+
+    def _invalidate_track_rows(self) -> None:
+        self._track_rows = None
+
     def rowCount(self, index: QModelIndex = QModelIndex) -> int:
-        return len(self.tracks)
+        return self._loaded_rows
+
+    def canFetchMore(self, parent: QModelIndex) -> bool:
+        return self._loaded_rows < len(self.tracks)
+
+    def fetchMore(self, parent: QModelIndex) -> None:
+        rows_to_load = min(len(self.tracks) - self._loaded_rows, MAIN_PANEL_FETCH_SIZE)
+        if rows_to_load <= 0:
+            return
+        self.beginInsertRows(QModelIndex(), self._loaded_rows, self._loaded_rows + rows_to_load - 1)
+        self._loaded_rows += rows_to_load
+        self.endInsertRows()
 
     def columnCount(self, index: QModelIndex = QModelIndex) -> int:
         return len(MAIN_PANEL_COLUMN_NAMES)
@@ -428,54 +656,82 @@ class TrackTableModel(QAbstractTableModel):
     def set_paused(self) -> None:
         self.is_stopped = False
         self.is_paused = True
-        if self.playing_track_index is not None:
-            self.dataChanged.emit(self.index(0, 1), self.index(self.rowCount(), 1))
+        self._emit_speaker_changed(self.playing_track_index)
 
     @pyqtSlot()
     def set_unpaused(self) -> None:
         self.is_stopped = False
         self.is_paused = False
-        if self.playing_track_index is not None:
-            self.dataChanged.emit(self.index(0, 1), self.index(self.rowCount(), 1))
+        self._emit_speaker_changed(self.playing_track_index)
 
     @pyqtSlot()
     def set_stopped(self):
         self.is_stopped = True
         self.is_paused = True
-        if self.playing_track_index is not None:
-            self.dataChanged.emit(self.index(0, 1), self.index(self.rowCount(), 1))
+        self._emit_speaker_changed(self.playing_track_index)
 
     @pyqtSlot(int)
     def set_playing_track_index(self, index: Optional[int]) -> None:
-        self.playing_track_index = index
-        self.dataChanged.emit(self.index(0, 1), self.index(self.rowCount(), 1))
+        old_index, self.playing_track_index = self.playing_track_index, index
+        if old_index != index:
+            self._emit_speaker_changed(old_index)
+        self._emit_speaker_changed(index)
+
+    def _emit_speaker_changed(self, row: Optional[int]) -> None:
+        """Repaints the speaker column of a row, the only cell that depends on the playing state."""
+        if row is not None and row < self._loaded_rows:
+            self.dataChanged.emit(self.index(row, 1), self.index(row, 1))
+
+    def rearrange_tracks(self, tracks: List[Track]) -> None:
+        """Replaces the tracks with the same tracks in another order, some of them or more of them, rows loaded so
+        far stay loaded."""
+        self.layoutAboutToBeChanged.emit()
+        self.tracks[:] = tracks
+        self._loaded_rows = min(max(self._loaded_rows, MAIN_PANEL_FETCH_SIZE), len(self.tracks))
+        self.layoutChanged.emit()
 
     @pyqtSlot(list)
     def delete_tracks(self, tracks: List[Track]) -> None:
-        self.layoutAboutToBeChanged.emit()
-        for track in self.tracks.copy():
-            if track in tracks:
-                self.tracks.remove(track)
-        self.layoutChanged.emit()
-        self.dataChanged.emit(self.index(0, 0), self.index(self.rowCount(), self.columnCount()))
+        """Removes the rows of the tracks, runs of adjacent rows are removed together starting from the bottom, so
+        the rows above stay where they are."""
+        rows = sorted({row for row in map(self.get_row, tracks) if row is not None})
+        # adjacent rows have the same difference to their position in rows
+        runs = [[row for _, row in run] for _, run in groupby(enumerate(rows), key=lambda item: item[1] - item[0])]
+        for run in reversed(runs):
+            first, last = run[0], run[-1]
+            if first >= self._loaded_rows:
+                # rows that haven't been fetched yet aren't known to the view
+                del self.tracks[first:last + 1]
+                continue
+            loaded_last = min(last, self._loaded_rows - 1)
+            self.beginRemoveRows(QModelIndex(), first, loaded_last)
+            del self.tracks[first:last + 1]
+            self._loaded_rows -= loaded_last - first + 1
+            self.endRemoveRows()
+        self._track_rows = None
 
     @pyqtSlot(Track, float)
     def update_track_rating(self, track: Track, _: float) -> None:
-        self.tracks[self.tracks.index(track)] = track
-        ind = self.tracks.index(track)
+        ind = self.get_row(track)
+        if ind is None:
+            return
+        self.tracks[ind] = track
+        if ind >= self._loaded_rows:
+            return
         self.dataChanged.emit(self.index(ind, 0), self.index(ind, len(MAIN_PANEL_COLUMN_NAMES) - 1))
 
 
 class TrackTableItemDelegate(QStyledItemDelegate):
+    """Paints cells of the track table. Elided texts are cached per track, column and column width, so they stay
+    valid when the tracks are sorted or filtered. Artwork is cached by the artwork repository."""
+
     def __init__(self, track_table_view: TrackTableView = None):
         super().__init__(track_table_view)
         self.padding = track_table_view.padding
         self._table_view: TrackTableView = track_table_view
-        self._tracks: List[Track] = []
 
-        self._cached_elided_texts: Dict[QModelIndex, str] = {}
-        self._cached_column_widths: Dict[int, int] = {}  # column index, column width
-        self._cached_pixmaps: Dict[QModelIndex, QPixmap] = {}
+        # (track, column index, column width), elided text
+        self._cached_elided_texts: OrderedDict[Tuple[Track, int, int], str] = OrderedDict()
 
     def paint(self, painter: QPainter, option: QStyleOptionViewItem, index: QModelIndex) -> None:
         painter.setPen(QPen(Qt.PenStyle.NoPen))
@@ -489,76 +745,71 @@ class TrackTableItemDelegate(QStyledItemDelegate):
         else:
             painter.setBrush(QBrush(Qt.GlobalColor.white))
 
-        display_role: Union[str, int] = index.data(Qt.ItemDataRole.DisplayRole)
-        decoration_role: QPixmap = index.data(Qt.ItemDataRole.DecorationRole)
+        column = index.column()
+        # only the artwork and speaker columns have decorations
+        decoration_role: Optional[QPixmap] = index.data(Qt.ItemDataRole.DecorationRole) if column < 2 else None
 
         if decoration_role and not decoration_role.isNull():
             rect = option.rect
             rect.setRect(rect.left() + 1, rect.top() + 1,
                          rect.width() - 2, rect.height() - 2)
 
-            if index in self._cached_pixmaps and index.column() != 1:
-                painter.drawPixmap(rect, self._cached_pixmaps[index])
+            pixmap = decoration_role
+            if column == 1:
+                old_height = rect.height()
+                rect.setHeight(pixmap.height())
+                rect.setWidth(pixmap.width())
+                rect.translate(2, (old_height - rect.height()) // 2)
+                painter.drawPixmap(rect, pixmap)
             else:
-                pixmap = decoration_role
-                if index.column() == 1:
-                    old_height = rect.height()
-                    rect.setHeight(pixmap.height())
-                    rect.setWidth(pixmap.width())
-                    rect.translate(2, (old_height - rect.height()) // 2)
+                # artwork is already scaled to fit the cell, so it's drawn at its own size
+                artwork_size = pixmap.deviceIndependentSize().toSize()
+                painter.drawPixmap(QStyle.alignedRect(option.direction, Qt.AlignmentFlag.AlignCenter,
+                                                      artwork_size, rect).topLeft(), pixmap)
+            return
 
-                painter.drawPixmap(rect, pixmap)
-                self._cached_pixmaps[index] = pixmap
+        elided_text = self._get_elided_text(option, index)
+        if not elided_text:
+            return
 
-        elif display_role:
-            if option.state & QStyle.StateFlag.State_Selected and self._table_view.hasFocus():
-                painter.setPen(QColor(option.palette.highlightedText()))
-            else:
-                painter.setPen(QColor(option.palette.text()))
-            if (index in self._cached_elided_texts and
-                    self._table_view.columnWidth(index.column()) == self._cached_column_widths[index.column()]):
-                if index.column():
-                    alignment = Qt.AlignmentFlag.AlignVCenter
-                    if index.column() == len(MAIN_PANEL_COLUMN_NAMES) - 1:
-                        alignment |= Qt.AlignmentFlag.AlignRight
-                else:
-                    alignment = Qt.AlignmentFlag.AlignCenter
+        if option.state & QStyle.StateFlag.State_Selected and self._table_view.hasFocus():
+            painter.setPen(QColor(option.palette.highlightedText()))
+        else:
+            painter.setPen(QColor(option.palette.text()))
 
-                option.rect.setLeft(option.rect.left() + self.padding)
-                option.rect.setRight(option.rect.right() - self.padding)
-                painter.drawText(option.rect, alignment, self._cached_elided_texts[index])
-            else:
-                self._cached_column_widths[index.column()] = self._table_view.columnWidth(index.column())
-                if MAIN_PANEL_COLUMN_NAMES[index.column()].lower() == "time":
-                    display_role = get_formatted_time_in_mins(display_role)
-
-                text = f"{display_role}"
-                if text:
-                    elided_text = QFontMetrics(option.font).elidedText(str(text), Qt.TextElideMode.ElideRight,
-                                                                       max(option.rect.width() - self.padding * 2, 18))
-                    if index.column():
-                        alignment = Qt.AlignmentFlag.AlignVCenter
-                        if index.column() == len(MAIN_PANEL_COLUMN_NAMES) - 1:
-                            alignment |= Qt.AlignmentFlag.AlignRight
-                    else:
-                        alignment = Qt.AlignmentFlag.AlignCenter
-
-                    option.rect.setLeft(option.rect.left() + self.padding)
-                    option.rect.setRight(option.rect.right() - self.padding)
-                    painter.drawText(option.rect, alignment, elided_text)
-
-                    self._cached_elided_texts[index] = f"{elided_text}"
-                    return
-                self._cached_elided_texts[index] = ""
+        if column:
+            alignment = Qt.AlignmentFlag.AlignVCenter
+            if column == len(MAIN_PANEL_COLUMN_NAMES) - 1:
+                alignment |= Qt.AlignmentFlag.AlignRight
+        else:
+            alignment = Qt.AlignmentFlag.AlignCenter
 
-    @pyqtSlot(list)
-    def set_tracks(self, tracks: List[Track]) -> None:
-        self._tracks = tracks
-        self.clear_cache()
+        option.rect.setLeft(option.rect.left() + self.padding)
+        option.rect.setRight(option.rect.right() - self.padding)
+        painter.drawText(option.rect, alignment, elided_text)
+
+    def _get_elided_text(self, option: QStyleOptionViewItem, index: QModelIndex) -> str:
+        key = (self._table_view.displayed_tracks()[index.row()], index.column(),
+               self._table_view.columnWidth(index.column()))
+        if key in self._cached_elided_texts:
+            self._cached_elided_texts.move_to_end(key)
+            return self._cached_elided_texts[key]
+
+        display_role: Union[str, int] = index.data(Qt.ItemDataRole.DisplayRole)
+        elided_text = ""
+        if display_role:
+            if MAIN_PANEL_COLUMN_NAMES[index.column()].lower() == "time":
+                display_role = get_formatted_time_in_mins(display_role)
+            elided_text = QFontMetrics(option.font).elidedText(f"{display_role}", Qt.TextElideMode.ElideRight,
+                                                               max(option.rect.width() - self.padding * 2, 18))
+
+        self._cached_elided_texts[key] = elided_text
+        if len(self._cached_elided_texts) > MAIN_PANEL_ELIDED_TEXT_CACHE_SIZE:
+            self._cached_elided_texts.popitem(last=False)
+        return elided_text
 
     def clear_cache(self) -> None:
-        self._cached_elided_texts = {}
-        self._cached_pixmaps = {}
+        self._cached_elided_texts.clear()
 
 
 class TrackTableHeader(QHeaderView):
@@ -5,7 +5,9 @@ from PyQt6.QtCore import Qt
 from PyQt6.QtGui import QPixmap
 from PyQt6.QtWidgets import *
 
+from constants import ARTWORK_PANEL_SIZE
 from data_models import Track
+from repositories import ArtworkRepository
 from utils import (ElidedLabel, get_embedded_artwork_pixmap, get_default_artwork_pixmap, SquareImageLabel,
                    TransparentComboBox, format_seconds)
 
@@ -67,7 +69,7 @@ class TrackInfoWidget(QWidget):
     def set_track(self, track: Track) -> None:
         self.playing_track_title_label.setText(str(track.title))
         self.currently_playing_track_info.setText(self._get_track_info(track))
-        artwork_pixmap = get_embedded_artwork_pixmap(track.file_path)
+        artwork_pixmap = ArtworkRepository().get_artwork_pixmap(track.file_path, ARTWORK_PANEL_SIZE)
         if not artwork_pixmap:
             artwork_pixmap = self.artwork_pixmap
         self.playing_track_image_label.pixmap = artwork_pixmap
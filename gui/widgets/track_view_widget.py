@@ -3,7 +3,7 @@ from typing import List
 
 from PyQt6 import QtWidgets
 from PyQt6.QtCore import pyqtSlot, pyqtSignal, Qt, QSize
-from PyQt6.QtWidgets import QWidget, QVBoxLayout, QAbstractItemView, QFrame, QHeaderView
+from PyQt6.QtWidgets import QWidget, QVBoxLayout, QAbstractItemView, QFrame, QHeaderView, QLineEdit
 
 from data_models import Track
 from gui.views import TrackTableView
@@ -36,6 +36,13 @@ class TrackViewWidget(QWidget):
         self.main_layout.setSpacing(0)
         self.main_layout.setAlignment(Qt.AlignmentFlag.AlignTop)
 
+        self.search_line_edit = QLineEdit(self)
+        self.search_line_edit.setPlaceholderText("Search")
+        self.search_line_edit.setClearButtonEnabled(True)
+        self.search_line_edit.setFrame(False)
+        self.search_line_edit.setStyleSheet("QLineEdit {border-bottom: 1px solid gray; padding: 2px 4px;}")
+        self.main_layout.addWidget(self.search_line_edit)
+
         self.track_table_view = TrackTableView(self)
         self.track_table_view.horizontalHeader().setMinimumSectionSize(4)
         self.track_table_view.horizontalHeader().setDefaultAlignment(Qt.AlignmentFlag.AlignLeft)
@@ -158,6 +165,7 @@ class TrackViewWidget(QWidget):
         self.main_layout.addWidget(self.track_table_view)
 
     def _setup_signals(self) -> None:
+        self.search_line_edit.textChanged.connect(self.track_table_view.set_filter_text)
         self.track_table_view.track_clicked.connect(self.track_clicked.emit)
         self.track_table_view.track_double_clicked.connect(self.track_double_clicked.emit)
 
@@ -176,21 +184,33 @@ class TrackViewWidget(QWidget):
     def set_tracks(self, tracks: List[Track]) -> None:
         self.track_table_view.set_tracks(tracks)
         self._displayed_tracks = tracks
-        index = self.displayed_tracks.index(self.playing_track) if self.playing_track in self.displayed_tracks else None
-        self.track_table_view.set_playing_track_index(index)
+        self.track_table_view.set_playing_track_index(self.track_table_view.get_track_row(self.playing_track))
         self.track_table_view.selectionModel().clearSelection()
         self.track_table_view.scrollToTop()
 
+    @pyqtSlot(list)
+    def add_tracks(self, tracks: List[Track]) -> None:
+        self.track_table_view.add_tracks(tracks)
+
+    @pyqtSlot(list)
+    def update_tracks(self, tracks: List[Track]) -> None:
+        self.track_table_view.update_tracks(tracks)
+
+    @pyqtSlot(list)
+    def remove_tracks(self, tracks: List[Track]) -> None:
+        self.track_table_view.remove_tracks(tracks)
+
     @pyqtSlot(Track)
     def set_playing_track(self, track: Track) -> None:
         self.playing_track = deepcopy(track)
         self.playing_track.queue_id = 0
         self.track_table_view.playing_track = self.playing_track
-        if self.playing_track not in self.displayed_tracks:
+        index = self.track_table_view.get_track_row(self.playing_track)
+        if index is None:
             self.track_table_view.set_playing_track_index(None)
             return
 
-        self.track_table_view.set_playing_track_index(self.displayed_tracks.index(self.playing_track))
+        self.track_table_view.set_playing_track_index(index)
         self.track_table_view.set_unpaused()
 
     @pyqtSlot()
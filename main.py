@@ -1,13 +1,30 @@
 import sys
 import time
 
-from gui.app import App
-from gui.main_window import MainWindow
-from constants import ROOT
+
+def close_database_connections() -> None:
+    stats = BaseRepository.get_connection_stats()
+    print(f"Database connections opened: {stats.opens}, queries: {stats.queries}, "
+          f"time spent in queries: {stats.query_time:.6f}")
+    BaseRepository.close_connections()
+
+    artwork_stats = ArtworkRepository().stats
+    print(f"Artwork cache memory hits: {artwork_stats.memory_hits}, disk hits: {artwork_stats.disk_hits}, "
+          f"misses: {artwork_stats.misses}, evictions: {artwork_stats.evictions}")
+    ArtworkRepository.close_connections()
+
 
 if __name__ == '__main__':
+    # tag reading processes are spawned and run this module again under another name, so the GUI is only imported
+    # when it's run as the application
+    from gui.app import App
+    from gui.main_window import MainWindow
+    from constants import ROOT
+    from repositories import BaseRepository, ArtworkRepository
+
     start = time.time()
     app = App(sys.argv)
+    app.aboutToQuit.connect(close_database_connections)
     main_window = MainWindow()
     print(ROOT)
     print(f"Window initialized in: {time.time() - start:.6f}")
@@ -1,3 +1,5 @@
 from .base_repository import BaseRepository
 from .tracks_repository import TracksRepository
 from .cached_tracks_repository import CachedTracksRepository
+from .artwork_repository import ArtworkRepository
+from .scan_journal_repository import ScanJournalRepository, ScanSession
@@ -0,0 +1,233 @@
+import os
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Iterable, Optional, Set, Tuple, Union
+
+from PyQt6.QtCore import Qt, QBuffer, QByteArray
+from PyQt6.QtGui import QGuiApplication, QImage, QPixmap
+
+from constants import (ARTWORK_MEMORY_CACHE_SIZE, ARTWORK_CACHE_PATH, ARTWORK_CACHE_MAX_SIZE,
+                       ARTWORK_BANNER_HEIGHT, ARTWORK_LAST_ACCESS_UPDATE_INTERVAL, ARTWORK_THUMBNAIL_SIZES)
+from database.database_manipulation import setup_artwork_cache_database
+from repositories import BaseRepository
+from repositories.connection_manager import ConnectionManager
+from utils import get_embedded_artwork_pixmap, get_embedded_artwork_image, get_banner_pixmap, Singleton
+
+
+@dataclass
+class ArtworkCacheStats:
+    memory_hits: int = 0
+    disk_hits: int = 0
+    misses: int = 0
+    evictions: int = 0
+
+
+class ArtworkRepository(BaseRepository, metaclass=Singleton):
+    """Loads embedded artwork on demand, so only tracks that are actually displayed have their files read.
+    Scaled artwork is kept in memory and in a thumbnail database next to the tracks database, so artwork
+    seen in previous sessions is never extracted from audio files again."""
+    connection_manager = ConnectionManager(ARTWORK_CACHE_PATH, setup_artwork_cache_database)
+
+    SCALED = "scaled"
+    BANNER = "banner"
+
+    def __init__(self):
+        super().__init__()
+
+        self.stats = ArtworkCacheStats()
+        # (file path, size, device pixel ratio, variant), QPixmap or None if the file has no artwork
+        self._cached_pixmaps: OrderedDict[Tuple[str, int, float, str], Optional[QPixmap]] = OrderedDict()
+        self._disk_cache_size: Optional[int] = None
+        # thumbnails are also written from the artwork extraction thread
+        self._disk_cache_lock = threading.Lock()
+        # sizes in device pixels thumbnails of new tracks are created in ahead of time, the views' sizes from the
+        # start, so nothing has to be painted first, and any other size they ask for later
+        device_pixel_ratio = self._get_device_pixel_ratio()
+        self._thumbnail_sizes: Set[int] = {round(size * device_pixel_ratio) for size in ARTWORK_THUMBNAIL_SIZES}
+        # files that couldn't be stat'ed, so they aren't looked up again on every paint until they're forgotten
+        self._missing_files: Set[str] = set()
+
+    def get_artwork_pixmap(self, file_path: str, size: Optional[int] = None,
+                           device_pixel_ratio: float = 1.0) -> Optional[QPixmap]:
+        """Returns artwork scaled to fit a size x size square, with size in device independent pixels, so it can be
+        painted as is without being scaled again. Scaled artwork is cached, full size artwork (size is None) is
+        not."""
+        if size is None:
+            return self._load_artwork_pixmap(file_path)
+        device_size = round(size * device_pixel_ratio)
+        if device_size not in self._thumbnail_sizes:
+            with self._disk_cache_lock:
+                self._thumbnail_sizes.add(device_size)
+        return self._get_pixmap(file_path, size, self.SCALED, device_pixel_ratio)
+
+    def cache_thumbnails(self, file_path: str) -> None:
+        """Writes thumbnails of the file's artwork in every size the views use to the disk cache, leaving the
+        memory cache alone. Artwork is decoded into a QImage, so this can run on any thread."""
+        with self._disk_cache_lock:
+            sizes = sorted(self._thumbnail_sizes)
+        try:
+            mtime = os.stat(file_path).st_mtime_ns
+        except OSError:
+            return
+
+        conn = self.get_connection()
+        cached_sizes = {row[0] for row in conn.execute("SELECT size FROM thumbnails WHERE file_path = ? AND "
+                                                       "variant = ? AND mtime = ?", (file_path, self.SCALED, mtime))}
+        sizes = [size for size in sizes if size not in cached_sizes]
+        if not sizes:
+            return
+
+        image = get_embedded_artwork_image(file_path)
+        for size in sizes:
+            data = None
+            if image:
+                data = self._encode_image(image.scaled(size, size, Qt.AspectRatioMode.KeepAspectRatio,
+                                                       Qt.TransformationMode.SmoothTransformation), "PNG")
+            self._store_thumbnail(file_path, mtime, size, self.SCALED, data)
+
+    def get_banner_pixmap(self, file_path: str) -> Optional[QPixmap]:
+        """Returns the blurred strip of the artwork used as the audio controller background."""
+        return self._get_pixmap(file_path, ARTWORK_BANNER_HEIGHT, self.BANNER)
+
+    def clear_cache(self) -> None:
+        self._cached_pixmaps.clear()
+
+    def forget_missing_files(self, file_paths: Optional[Iterable[str]] = None) -> None:
+        """Lets artwork of files that were missing be read again, of all of them when file_paths is None."""
+        if file_paths is None:
+            self._missing_files.clear()
+        else:
+            self._missing_files.difference_update(file_paths)
+
+    def _get_pixmap(self, file_path: str, size: int, variant: str,
+                    device_pixel_ratio: float = 1.0) -> Optional[QPixmap]:
+        key = (file_path, size, device_pixel_ratio, variant)
+        if key in self._cached_pixmaps:
+            self.stats.memory_hits += 1
+            self._cached_pixmaps.move_to_end(key)
+            return self._cached_pixmaps[key]
+        if file_path in self._missing_files:
+            return None
+
+        try:
+            mtime = os.stat(file_path).st_mtime_ns
+        except OSError:
+            self._missing_files.add(file_path)
+            return None
+
+        # thumbnails are stored in device pixels
+        device_size = round(size * device_pixel_ratio)
+        is_cached, pixmap = self._read_thumbnail(file_path, mtime, device_size, variant)
+        if is_cached:
+            self.stats.disk_hits += 1
+        else:
+            self.stats.misses += 1
+            pixmap = self._create_pixmap(file_path, device_size, variant)
+            self._write_thumbnail(file_path, mtime, device_size, variant, pixmap)
+        if pixmap:
+            pixmap.setDevicePixelRatio(device_pixel_ratio)
+
+        self._cached_pixmaps[key] = pixmap
+        if len(self._cached_pixmaps) > ARTWORK_MEMORY_CACHE_SIZE:
+            self._cached_pixmaps.popitem(last=False)
+        return pixmap
+
+    def _create_pixmap(self, file_path: str, size: int, variant: str) -> Optional[QPixmap]:
+        pixmap = self._load_artwork_pixmap(file_path)
+        if not pixmap:
+            return None
+
+        if variant == self.BANNER:
+            return get_banner_pixmap(pixmap, size)
+        return pixmap.scaled(size, size,
+                             Qt.AspectRatioMode.KeepAspectRatio,
+                             Qt.TransformationMode.SmoothTransformation)
+
+    def _read_thumbnail(self, file_path: str, mtime: int, size: int,
+                        variant: str) -> Tuple[bool, Optional[QPixmap]]:
+        """Returns whether an up-to-date thumbnail was found and the thumbnail itself, which is None for files
+        without artwork."""
+        conn = self.get_connection()
+        row = conn.execute("SELECT mtime, data, last_access FROM thumbnails WHERE file_path = ? AND size = ? AND "
+                           "variant = ?", (file_path, size, variant)).fetchone()
+        if row is None or row[0] != mtime:
+            return False, None
+
+        # eviction only needs a rough order, so thumbnails read while painting aren't written to every time
+        now = time.time()
+        if now - row[2] > ARTWORK_LAST_ACCESS_UPDATE_INTERVAL:
+            with conn:
+                conn.execute("UPDATE thumbnails SET last_access = ? WHERE file_path = ? AND size = ? AND variant = ?",
+                             (now, file_path, size, variant))
+
+        if row[1] is None:
+            return True, None
+        pixmap = QPixmap()
+        if not pixmap.loadFromData(row[1]):
+            return False, None
+        return True, pixmap
+
+    def _write_thumbnail(self, file_path: str, mtime: int, size: int, variant: str,
+                         pixmap: Optional[QPixmap]) -> None:
+        data = self._encode_image(pixmap, "JPG" if variant == self.BANNER else "PNG") if pixmap else None
+        self._store_thumbnail(file_path, mtime, size, variant, data)
+
+    @staticmethod
+    def _encode_image(image: Union[QPixmap, QImage], image_format: str) -> bytes:
+        byte_array = QByteArray()
+        buffer = QBuffer(byte_array)
+        buffer.open(QBuffer.OpenModeFlag.WriteOnly)
+        image.save(buffer, image_format)
+        return bytes(byte_array)
+
+    def _store_thumbnail(self, file_path: str, mtime: int, size: int, variant: str, data: Optional[bytes]) -> None:
+        byte_size = len(data) if data else 0
+        with self._disk_cache_lock:
+            disk_cache_size = self._get_disk_cache_size()
+            conn = self.get_connection()
+            with conn:
+                previous = conn.execute("SELECT byte_size FROM thumbnails WHERE file_path = ? AND size = ? AND "
+                                        "variant = ?", (file_path, size, variant)).fetchone()
+                conn.execute("INSERT OR REPLACE INTO thumbnails (file_path, mtime, size, variant, data, byte_size, "
+                             "last_access) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                             (file_path, mtime, size, variant, data, byte_size, time.time()))
+
+            self._disk_cache_size = disk_cache_size + byte_size - (previous[0] if previous else 0)
+            if self._disk_cache_size > ARTWORK_CACHE_MAX_SIZE:
+                self._evict_thumbnails()
+
+    def _get_disk_cache_size(self) -> int:
+        if self._disk_cache_size is None:
+            conn = self.get_connection()
+            self._disk_cache_size = conn.execute("SELECT COALESCE(SUM(byte_size), 0) FROM thumbnails").fetchone()[0]
+        return self._disk_cache_size
+
+    def _evict_thumbnails(self) -> None:
+        """Removes least recently used thumbnails until the cache is back under 90% of its maximum size."""
+        target_size = ARTWORK_CACHE_MAX_SIZE * 0.9
+        conn = self.get_connection()
+        with conn:
+            rows = conn.execute("SELECT rowid, byte_size FROM thumbnails ORDER BY last_access").fetchall()
+            to_delete = []
+            for rowid, byte_size in rows:
+                if self._disk_cache_size <= target_size:
+                    break
+                to_delete.append((rowid, ))
+                self._disk_cache_size -= byte_size
+            conn.executemany("DELETE FROM thumbnails WHERE rowid = ?", to_delete)
+        self.stats.evictions += len(to_delete)
+
+    @staticmethod
+    def _get_device_pixel_ratio() -> float:
+        application = QGuiApplication.instance()
+        screen = application.primaryScreen() if isinstance(application, QGuiApplication) else None
+        return screen.devicePixelRatio() if screen else 1.0
+
+    @staticmethod
+    def _load_artwork_pixmap(file_path: str) -> Optional[QPixmap]:
+        pixmap = get_embedded_artwork_pixmap(file_path)
+        if not pixmap or pixmap.isNull():
+            return None
+        return pixmap
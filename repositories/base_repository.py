@@ -1,20 +1,29 @@
-import os.path
-import sqlite3
-from sqlite3 import Connection
 from typing import List, Any
 
 from constants import DATABASE_PATH
 from database.database_manipulation import setup_database
+from repositories.connection_manager import ConnectionManager, ConnectionStats, TrackedConnection
+from repositories.query_builder import UnknownTableError
 
 
 class BaseRepository:
+    connection_manager = ConnectionManager(DATABASE_PATH, setup_database)
 
-    @staticmethod
-    def get_connection() -> Connection:
-        if not os.path.exists(DATABASE_PATH):
-            setup_database()
+    @classmethod
+    def get_connection(cls) -> TrackedConnection:
+        return cls.connection_manager.get_connection()
 
-        return sqlite3.connect(DATABASE_PATH)
+    @classmethod
+    def get_connection_stats(cls) -> ConnectionStats:
+        return cls.connection_manager.stats
+
+    @classmethod
+    def close_connections(cls) -> None:
+        cls.connection_manager.close_all()
+
+    @classmethod
+    def close_thread_connection(cls) -> None:
+        cls.connection_manager.close_thread_connection()
 
     def get_all_table_names(self) -> List[str]:
         conn = self.get_connection()
@@ -28,12 +37,12 @@ class BaseRepository:
         conn = self.get_connection()
         cursor = conn.cursor()
 
-        table_rows = cursor.execute(f"SELECT * FROM {table_name}").fetchall()
+        table_rows = cursor.execute(f'SELECT * FROM "{self._check_table_name(table_name)}"').fetchall()
         return table_rows
 
     def get_all_table_columns(self, table_name: str) -> List[Any]:
         conn = self.get_connection()
-        cursor = conn.execute(f"SELECT * FROM {table_name}")
+        cursor = conn.execute(f'SELECT * FROM "{self._check_table_name(table_name)}"')
 
         table_columns = list(cursor.description)
         for index, column in enumerate(table_columns):
@@ -48,7 +57,8 @@ class BaseRepository:
         table_names = self.get_all_table_names()
         if table_names:
             for name in table_names:
-                cursor.execute(f"DROP TABLE {name}")
+                cursor.execute(f'DROP TABLE "{name}"')
+        conn.commit()
 
     def create_table(self, table_name: str, table_columns: List) -> None:
         conn = self.get_connection()
@@ -61,7 +71,12 @@ class BaseRepository:
         conn = self.get_connection()
         cursor = conn.cursor()
 
-        cursor.execute(f"DELETE FROM {table_name};")
+        cursor.execute(f'DELETE FROM "{self._check_table_name(table_name)}";')
 
         conn.commit()
-        conn.close()
+
+    def _check_table_name(self, table_name: str) -> str:
+        """Table names can't be bound as parameters, so only names of existing tables are let into queries."""
+        if table_name not in self.get_all_table_names():
+            raise UnknownTableError(f"No table named {table_name!r}")
+        return table_name
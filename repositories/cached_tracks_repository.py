@@ -1,65 +1,125 @@
-from typing import Union, List, Tuple, Optional, Dict
+import threading
+from typing import Union, List, Tuple, Optional, Dict, Iterable
 
-from constants import GROUP_OPTIONS
+from constants import GROUP_OPTIONS, BULK_INSERT_CHUNK_SIZE
 from data_models import Track
 from repositories import TracksRepository
-from utils import Singleton
+from repositories.artwork_repository import ArtworkRepository
+from repositories.library_index import LibraryIndex
+from utils import Singleton, TrackSearchIndex
 
 
 class CachedTracksRepository(TracksRepository, metaclass=Singleton):
+    """Serves reads from an in-memory LibraryIndex built with a single query, writes go to the database and
+    are applied to the index incrementally. The search index is built on another thread and kept in sync the
+    same way."""
+
     def __init__(self):
         super().__init__()
 
-        self.cached_track_groups: Dict[Tuple[str, Optional[Union[str, int]]], List[Track]] = {}
-        self.cached_counts: Dict[str, List[Tuple[str, int]]] = {}
+        self._library_index: Optional[LibraryIndex] = None
+        self._search_index: Optional[TrackSearchIndex] = None
+
+    @property
+    def library_index(self) -> LibraryIndex:
+        if self._library_index is None:
+            self._library_index = LibraryIndex(super().iter_tracks(), GROUP_OPTIONS)
+        return self._library_index
+
+    @property
+    def search_index(self) -> TrackSearchIndex:
+        if self._search_index is None:
+            self._search_index = TrackSearchIndex()
+            threading.Thread(target=self._search_index.build, args=(self.library_index.get_tracks(),),
+                             daemon=True).start()
+        return self._search_index
+
+    def get_tracks(self) -> List[Track]:
+        return self.library_index.get_tracks()
 
     def get_tracks_by(self, key: str, value: Optional[Union[str, int]]) -> List[Track]:
-        tuple_key = (key.lower(), value)
-        if tuple_key not in self.cached_track_groups:
-            self.cached_track_groups[tuple_key] = super().get_tracks_by(key, value)
+        if value == "all":
+            return self.get_tracks()
+        if not self.library_index.has_group_key(key):
+            return super().get_tracks_by(key, value)
 
-        return self.cached_track_groups[tuple_key]
+        return self.library_index.get_tracks_by(key, value if value else None)
 
     def get_track_counts_grouped_by_key(self, group_key: str) -> List[Tuple[str, int]]:
-        group_key = group_key.lower()
-        if group_key not in self.cached_counts:
-            self.cached_counts[group_key] = super().get_track_counts_grouped_by_key(group_key)
-        return self.cached_counts[group_key]
+        if not self.library_index.has_group_key(group_key):
+            return super().get_track_counts_grouped_by_key(group_key)
+        return self.library_index.get_track_counts(group_key)
+
+    def get_track_count(self) -> int:
+        return len(self.library_index)
+
+    def add_tracks(self, tracks: Iterable[Track], chunk_size: int = BULK_INSERT_CHUNK_SIZE) -> List[int]:
+        tracks = list(tracks)
+        track_ids = super().add_tracks(tracks, chunk_size)
+        self.add_to_cache(tracks)
+        return track_ids
 
     def update_track(self, track: Track, column: str, value: Union[int, float, str]) -> None:
-        super().update_track(track, column, value)
+        self.update_tracks_bulk(column, {track.track_id: value})
 
-        for group in self.cached_track_groups.values():
-            if track in group:
-                setattr(group[group.index(track)], column, value)
+    def update_tracks_bulk(self, column: str, values: Dict[int, Union[int, float, str]]) -> None:
+        super().update_tracks_bulk(column, values)
 
-    # def delete_track_by(self, key: str, value: Union[int, float, str]) -> None:  # todo fix with cache
-    #     super().delete_track_by(key, value)
+        if self._library_index is not None:
+            for track_id, value in values.items():
+                self._library_index.update(track_id, column, value)
+        if self._search_index is not None and column.lower() in TrackSearchIndex.SEARCH_FIELDS:
+            self._search_index.add_tracks(self._library_index.tracks_by_id[track_id] for track_id in values
+                                          if track_id in self._library_index.tracks_by_id)
 
     def delete_tracks(self, tracks: List[Track]) -> None:
-        for track in tracks:
-            self.delete_track_by("file_path", track.file_path)
+        self.delete_tracks_bulk(tracks)
+
+    def delete_tracks_bulk(self, tracks: Iterable[Track]) -> None:
+        tracks = list(tracks)
+        super().delete_tracks_bulk(tracks)
+        self.remove_from_cache(tracks)
 
-        new = {}
-        for key, value in self.cached_track_groups.items():
+    def update_tracks_metadata(self, tracks: Iterable[Track]) -> None:
+        tracks = list(tracks)
+        super().update_tracks_metadata(tracks)
+        self.update_in_cache(tracks)
+
+    def add_to_cache(self, tracks: Iterable[Track]) -> None:
+        """For tracks that were already added to the database, e.g. by a scanner on another thread."""
+        tracks = list(tracks)
+        if self._library_index is not None:
+            for track in tracks:
+                self._library_index.add(track)
+        if self._search_index is not None:
+            self._search_index.add_tracks(tracks)
+
+    def update_in_cache(self, tracks: Iterable[Track]) -> None:
+        """Replaces cached tracks whose tags were read again, the cached rating is kept."""
+        tracks = list(tracks)
+        if self._library_index is not None:
             for track in tracks:
-                if track in value:
-                    value.remove(track)
-            if value:
-                new[key] = value
-        self.cached_track_groups = new
-
-        self.cached_counts = {}
-        for group_key in GROUP_OPTIONS:
-            self.get_track_counts_grouped_by_key(group_key)
-
-    def load_cache(self):
-        for group_key in GROUP_OPTIONS:
-            for group_name, _ in self.get_track_counts_grouped_by_key(group_key):
-                self.get_tracks_by(group_key, group_name)
-            self.get_tracks_by(group_key, None)
-            self.get_tracks_by(group_key, 'all')
-
-    def delete_cache(self):
-        self.cached_track_groups = {}
-        self.cached_counts = {}
+                old_track = self._library_index.tracks_by_id.get(track.track_id)
+                if old_track is not None:
+                    track.rating = old_track.rating
+                self._library_index.replace(track)
+        if self._search_index is not None:
+            self._search_index.add_tracks(tracks)
+
+    def remove_from_cache(self, tracks: Iterable[Track]) -> None:
+        """For tracks that were already deleted from the database, e.g. by a scanner on another thread."""
+        tracks = list(tracks)
+        if self._library_index is not None:
+            for track in tracks:
+                self._library_index.remove(track.track_id)
+        if self._search_index is not None:
+            self._search_index.remove_tracks(tracks)
+        ArtworkRepository().forget_missing_files(track.file_path for track in tracks)
+
+    def load_cache(self) -> None:
+        _ = self.library_index
+        _ = self.search_index
+
+    def delete_cache(self) -> None:
+        self._library_index = None
+        self._search_index = None
@@ -0,0 +1,124 @@
+import os.path
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass
+from typing import Callable, List, Optional
+
+from constants import DATABASE_CACHE_SIZE_KIB, DATABASE_MMAP_SIZE, DATABASE_CACHED_STATEMENTS
+
+
+@dataclass
+class ConnectionStats:
+    opens: int = 0
+    queries: int = 0
+    query_time: float = 0.0  # seconds
+
+
+class TrackedCursor(sqlite3.Cursor):
+    def execute(self, sql: str, parameters=()) -> sqlite3.Cursor:
+        start = time.perf_counter()
+        try:
+            return super().execute(sql, parameters)
+        finally:
+            self.connection.manager.record_query(time.perf_counter() - start)
+
+    def executemany(self, sql: str, seq_of_parameters) -> sqlite3.Cursor:
+        start = time.perf_counter()
+        try:
+            return super().executemany(sql, seq_of_parameters)
+        finally:
+            self.connection.manager.record_query(time.perf_counter() - start)
+
+
+class TrackedConnection(sqlite3.Connection):
+    manager: "ConnectionManager" = None
+
+    def cursor(self, factory=TrackedCursor) -> sqlite3.Cursor:
+        return super().cursor(factory)
+
+    def execute(self, sql: str, parameters=()) -> sqlite3.Cursor:
+        return self.cursor().execute(sql, parameters)
+
+    def executemany(self, sql: str, seq_of_parameters) -> sqlite3.Cursor:
+        return self.cursor().executemany(sql, seq_of_parameters)
+
+
+class ConnectionManager:
+    """Hands out one long-lived connection per thread for a single database file."""
+
+    def __init__(self, database_path: str, setup_database: Optional[Callable[[sqlite3.Connection], None]] = None):
+        self.database_path = database_path
+        self.stats = ConnectionStats()
+
+        self._setup_database = setup_database
+        self._is_database_set_up = False
+        self._local = threading.local()
+        self._lock = threading.RLock()
+        self._connections: List[TrackedConnection] = []
+
+    def get_connection(self) -> TrackedConnection:
+        conn = getattr(self._local, "connection", None)
+        if conn is None:
+            conn = self._open()
+            self._local.connection = conn
+        return conn
+
+    def record_query(self, elapsed: float) -> None:
+        with self._lock:
+            self.stats.queries += 1
+            self.stats.query_time += elapsed
+
+    def close_all(self) -> None:
+        with self._lock:
+            connections, self._connections = self._connections, []
+
+        for conn in connections:
+            try:
+                conn.commit()
+                conn.close()
+            except sqlite3.Error as e:
+                print(e)
+        self._local = threading.local()
+
+    def close_thread_connection(self) -> None:
+        """Closes the calling thread's connection, has to be called by threads that finish before the application
+        does, their connections would stay open otherwise."""
+        conn = getattr(self._local, "connection", None)
+        if conn is None:
+            return
+        self._local.connection = None
+        with self._lock:
+            if conn in self._connections:
+                self._connections.remove(conn)
+
+        try:
+            conn.commit()
+            conn.close()
+        except sqlite3.Error as e:
+            print(e)
+
+    def _open(self) -> TrackedConnection:
+        with self._lock:
+            os.makedirs(os.path.dirname(self.database_path), exist_ok=True)
+
+            conn = sqlite3.connect(self.database_path, factory=TrackedConnection, check_same_thread=False,
+                                   cached_statements=DATABASE_CACHED_STATEMENTS)
+            conn.manager = self
+            self._configure(conn)
+
+            if self._setup_database and not self._is_database_set_up:
+                self._setup_database(conn)
+                self._is_database_set_up = True
+
+            self._connections.append(conn)
+            self.stats.opens += 1
+        return conn
+
+    @staticmethod
+    def _configure(conn: sqlite3.Connection) -> None:
+        conn.execute("PRAGMA journal_mode = WAL")
+        conn.execute("PRAGMA synchronous = NORMAL")
+        conn.execute(f"PRAGMA cache_size = -{DATABASE_CACHE_SIZE_KIB}")
+        conn.execute(f"PRAGMA mmap_size = {DATABASE_MMAP_SIZE}")
+        conn.execute("PRAGMA temp_store = MEMORY")
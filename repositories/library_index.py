@@ -0,0 +1,103 @@
+import bisect
+from collections import defaultdict
+from typing import Dict, Iterable, List, Optional, Tuple, Union
+
+from data_models import Track
+
+GroupValue = Optional[Union[str, int]]
+
+
+class LibraryIndex:
+    """Holds one Track instance per track_id and, for every group key, the ids of the tracks in each group.
+    Tracks and id lists are kept sorted by id, so tracks come out in the same order the database returns them in."""
+
+    def __init__(self, tracks: Iterable[Track], group_keys: Iterable[str]):
+        self.group_keys = tuple(group_key.lower() for group_key in group_keys)
+        self.tracks_by_id: Dict[int, Track] = {}
+        self.groups: Dict[str, Dict[GroupValue, List[int]]] = {group_key: defaultdict(list)
+                                                                for group_key in self.group_keys}
+        for track in tracks:
+            self.tracks_by_id[track.track_id] = track
+            for group_key in self.group_keys:
+                self.groups[group_key][getattr(track, group_key)].append(track.track_id)
+
+        for groups in self.groups.values():
+            for track_ids in groups.values():
+                track_ids.sort()
+
+    def __len__(self) -> int:
+        return len(self.tracks_by_id)
+
+    def has_group_key(self, group_key: str) -> bool:
+        return group_key.lower() in self.groups
+
+    def get_tracks(self) -> List[Track]:
+        return list(self.tracks_by_id.values())
+
+    def get_tracks_by(self, group_key: str, value: GroupValue) -> List[Track]:
+        """Returns a new list on every call, so callers are free to sort or modify it."""
+        track_ids = self.groups[group_key.lower()].get(value, ())
+        return [self.tracks_by_id[track_id] for track_id in track_ids]
+
+    def get_track_counts(self, group_key: str) -> List[Tuple[GroupValue, int]]:
+        """Same ordering as GROUP BY in SQLite, tracks without a value come first."""
+        return sorted(((value, len(track_ids)) for value, track_ids in self.groups[group_key.lower()].items()),
+                      key=lambda count: (count[0] is not None, count[0]))
+
+    def add(self, track: Track) -> None:
+        last_track_id = next(reversed(self.tracks_by_id), None)
+        self.tracks_by_id[track.track_id] = track
+        if last_track_id is not None and track.track_id < last_track_id:
+            # new tracks get ids larger than any other, a smaller one has to be moved to its place
+            tracks = sorted(self.tracks_by_id.items())
+            self.tracks_by_id.clear()
+            self.tracks_by_id.update(tracks)
+        for group_key in self.group_keys:
+            bisect.insort(self.groups[group_key][getattr(track, group_key)], track.track_id)
+
+    def replace(self, track: Track) -> Optional[Track]:
+        """Replaces the track with the same id, which keeps its place, and returns the old one. Tracks that aren't
+        in the index are added."""
+        old_track = self.tracks_by_id.get(track.track_id)
+        if old_track is None:
+            self.add(track)
+            return None
+
+        self.tracks_by_id[track.track_id] = track
+        for group_key in self.group_keys:
+            old_value, value = getattr(old_track, group_key), getattr(track, group_key)
+            if old_value != value:
+                self._remove_from_group(group_key, old_value, track.track_id)
+                bisect.insort(self.groups[group_key][value], track.track_id)
+        return old_track
+
+    def remove(self, track_id: int) -> Optional[Track]:
+        track = self.tracks_by_id.pop(track_id, None)
+        if track is None:
+            return None
+
+        for group_key in self.group_keys:
+            self._remove_from_group(group_key, getattr(track, group_key), track_id)
+        return track
+
+    def update(self, track_id: int, column: str, value: Union[int, float, str]) -> None:
+        track = self.tracks_by_id.get(track_id)
+        if track is None:
+            return
+
+        column = column.lower()
+        if column in self.groups:
+            self._remove_from_group(column, getattr(track, column), track_id)
+            bisect.insort(self.groups[column][value], track_id)
+        setattr(track, column, value)
+
+    def _remove_from_group(self, group_key: str, value: GroupValue, track_id: int) -> None:
+        # get() instead of indexing, which would add an empty group to the defaultdict
+        track_ids = self.groups[group_key].get(value)
+        if not track_ids:
+            return
+        i = bisect.bisect_left(track_ids, track_id)
+        if i < len(track_ids) and track_ids[i] == track_id:
+            del track_ids[i]
+        if not track_ids:
+            del self.groups[group_key][value]
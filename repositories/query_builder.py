@@ -0,0 +1,77 @@
+import sqlite3
+from typing import Any, Callable, Optional, Tuple
+
+Query = Tuple[str, Tuple[Any, ...]]
+
+
+class UnknownColumnError(ValueError):
+    pass
+
+
+class UnknownTableError(ValueError):
+    pass
+
+
+class QueryBuilder:
+    """Builds queries for a single table. Column names are checked against the table's schema and quoted, values
+    are always bound as parameters, so the same query text is produced for every value and SQLite can reuse the
+    compiled statement from the connection's statement cache."""
+
+    def __init__(self, table_name: str, get_connection: Callable[[], sqlite3.Connection]):
+        self.table_name = table_name
+        self._get_connection = get_connection
+        self._columns: Optional[Tuple[str, ...]] = None
+
+    @property
+    def columns(self) -> Tuple[str, ...]:
+        if self._columns is None:
+            rows = self._get_connection().execute(f'PRAGMA table_info("{self.table_name}")').fetchall()
+            self._columns = tuple(row[1].lower() for row in rows)
+        return self._columns
+
+    def column(self, name: str) -> str:
+        name = name.lower()
+        if name not in self.columns:
+            raise UnknownColumnError(f"{self.table_name} has no column {name!r}")
+        return f'"{name}"'
+
+    def select_where(self, column: str, value: Any) -> Query:
+        return self.select(where=(column, value))
+
+    def select(self, where: Optional[Tuple[str, Any]] = None, after: Optional[Tuple[str, Any]] = None,
+               order_by: Optional[str] = None, limit: Optional[int] = None) -> Query:
+        """where matches a column against a value (None matches NULL), after keeps only rows whose column is
+        greater than the value, which together with order_by on the same column gives keyset pagination."""
+        query = f'SELECT * FROM "{self.table_name}"'
+        conditions = []
+        parameters = []
+        if where is not None:
+            column, value = where
+            if value is None:
+                conditions.append(f"{self.column(column)} IS NULL")
+            else:
+                conditions.append(f"{self.column(column)} = ?")
+                parameters.append(value)
+        if after is not None:
+            column, value = after
+            conditions.append(f"{self.column(column)} > ?")
+            parameters.append(value)
+
+        if conditions:
+            query += " WHERE " + " AND ".join(conditions)
+        if order_by is not None:
+            query += f" ORDER BY {self.column(order_by)}"
+        if limit is not None:
+            query += " LIMIT ?"
+            parameters.append(limit)
+        return query, tuple(parameters)
+
+    def count_grouped_by(self, column: str) -> str:
+        column = self.column(column)
+        return f'SELECT {column}, COUNT(*) FROM "{self.table_name}" GROUP BY {column}'
+
+    def update_column_where(self, column: str, where_column: str) -> str:
+        return f'UPDATE "{self.table_name}" SET {self.column(column)} = ? WHERE {self.column(where_column)} = ?'
+
+    def delete_where(self, column: str) -> str:
+        return f'DELETE FROM "{self.table_name}" WHERE {self.column(column)} = ?'
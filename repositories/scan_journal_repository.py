@@ -0,0 +1,70 @@
+import time
+from dataclasses import dataclass
+from typing import Iterable, List, Optional
+
+from repositories import BaseRepository
+from utils import Singleton
+
+
+@dataclass
+class ScanSession:
+    session_id: int
+    folders: List[str]
+    walk_complete: bool
+
+
+class ScanJournalRepository(BaseRepository, metaclass=Singleton):
+    """Journals what a scan still has to do, paths of new and modified files to parse and paths of vanished
+    files to remove, along with whether the folders were walked to the end. A session is deleted once the
+    scan finishes, an unfinished one is left behind by a scan that was cancelled or never got to finish."""
+    PARSE = "parse"
+    REMOVE = "remove"
+
+    PENDING = "pending"
+    DONE = "done"
+
+    def get_unfinished_session(self) -> Optional[ScanSession]:
+        row = self.get_connection().execute("SELECT session_id, folders, walk_complete FROM scan_sessions "
+                                            "ORDER BY session_id DESC LIMIT 1").fetchone()
+        if row is None:
+            return None
+        return ScanSession(row[0], row[1].split("\n"), bool(row[2]))
+
+    def start_session(self, folders: List[str]) -> ScanSession:
+        """Starts a new session, unfinished ones are discarded, their work is redone by the new walk."""
+        conn = self.get_connection()
+        with conn:
+            conn.execute("DELETE FROM scan_journal")
+            conn.execute("DELETE FROM scan_sessions")
+            cursor = conn.execute("INSERT INTO scan_sessions (folders, started) VALUES (?, ?)",
+                                  ("\n".join(folders), time.time()))
+        return ScanSession(cursor.lastrowid, folders, False)
+
+    def set_walk_complete(self, session_id: int) -> None:
+        conn = self.get_connection()
+        with conn:
+            conn.execute("UPDATE scan_sessions SET walk_complete = 1 WHERE session_id = ?", (session_id,))
+
+    def finish_session(self, session_id: int) -> None:
+        conn = self.get_connection()
+        with conn:
+            conn.execute("DELETE FROM scan_journal WHERE session_id = ?", (session_id,))
+            conn.execute("DELETE FROM scan_sessions WHERE session_id = ?", (session_id,))
+
+    def add_paths(self, session_id: int, action: str, file_paths: Iterable[str]) -> None:
+        conn = self.get_connection()
+        with conn:
+            conn.executemany("INSERT OR IGNORE INTO scan_journal (session_id, file_path, action) VALUES (?, ?, ?)",
+                             ((session_id, file_path, action) for file_path in file_paths))
+
+    def mark_done(self, session_id: int, action: str, file_paths: Iterable[str]) -> None:
+        conn = self.get_connection()
+        with conn:
+            conn.executemany("UPDATE scan_journal SET state = ? "
+                             "WHERE session_id = ? AND file_path = ? AND action = ?",
+                             ((self.DONE, session_id, file_path, action) for file_path in file_paths))
+
+    def get_pending_paths(self, session_id: int, action: str) -> List[str]:
+        return [row[0] for row in self.get_connection().execute(
+            "SELECT file_path FROM scan_journal WHERE session_id = ? AND action = ? AND state = ?",
+            (session_id, action, self.PENDING))]
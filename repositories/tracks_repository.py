@@ -1,142 +1,273 @@
+import itertools
 import os
 import sqlite3
-from typing import List, Union, Iterable, Tuple, Optional
+import sys
+import time
+from typing import List, Union, Iterable, Tuple, Optional, Set, Dict, Iterator
 
-import eyed3
-from PyQt6.QtWidgets import QApplication
-
-from constants import SUPPORTED_AUDIO_FORMATS
+from constants import BULK_INSERT_CHUNK_SIZE, TRACKS_FETCH_BATCH_SIZE
 from data_models.track import Track
 from repositories import BaseRepository
-from utils import get_embedded_artwork_pixmap, Singleton
+from repositories.query_builder import QueryBuilder
+from utils import Singleton, TagReader
+
+
+def _intern(value: Optional[str]) -> Optional[str]:
+    return sys.intern(value) if isinstance(value, str) else value
 
 
 class TracksRepository(BaseRepository, metaclass=Singleton):
     def __init__(self):
         super().__init__()
-        self._cached_pixmaps = {}  # track_id, QPixmap
 
-    def add_track(self, track: Track) -> None:
-        conn = self.get_connection()
-        cursor = conn.cursor()
+        self.queries = QueryBuilder("tracks", self.get_connection)
 
-        cursor.execute("INSERT INTO tracks VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
-                       (None,
-                        track.file_path,
-                        track.title,
-                        track.album,
-                        track.artist,
-                        track.composer,
-                        track.genre,
-                        track.year,
-                        track.length,
-                        track.size,
-                        track.rating
-                        ))
-        conn.commit()
-        conn.close()
+    def add_track(self, track: Track) -> int:
+        return self.add_tracks([track])[0]
 
-    def add_tracks(self, tracks: Iterable[Track]) -> None:
-        for track in tracks:
-            self.add_track(track)
+    def add_tracks(self, tracks: Iterable[Track], chunk_size: int = BULK_INSERT_CHUNK_SIZE) -> List[int]:
+        """Inserts all tracks in a single transaction and returns their assigned track ids. Tracks are
+        updated in place with their new ids."""
+        tracks = list(tracks)
+        if not tracks:
+            return []
 
-    def add_new_tracks(self, tracks: Iterable[Track]) -> None:  # TODO remove?
-        existing_tracks = self.get_tracks()
+        start = time.perf_counter()
+        conn = self.get_connection()
+        track_ids: List[int] = []
+        with conn:
+            cursor = conn.cursor()
+            # ids are assigned explicitly so they can be returned, which is safe while the write lock is held
+            if not conn.in_transaction:
+                cursor.execute("BEGIN IMMEDIATE")
+            last_track_id = cursor.execute("SELECT MAX(track_id) FROM tracks").fetchone()[0] or 0
+            last_sequence = cursor.execute("SELECT seq FROM sqlite_sequence WHERE name = 'tracks'").fetchone()
+            next_track_id = max(last_track_id, last_sequence[0] if last_sequence else 0) + 1
+
+            for chunk_start in range(0, len(tracks), chunk_size):
+                chunk = tracks[chunk_start:chunk_start + chunk_size]
+                chunk_ids = range(next_track_id, next_track_id + len(chunk))
+                cursor.executemany("INSERT INTO tracks (track_id, file_path, folder, title, album, artist, composer, "
+                                   "genre, year, length, size, rating, mtime, inode, content_hash) "
+                                   "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                                   [(track_id,
+                                     track.file_path,
+                                     track.folder,
+                                     track.title,
+                                     track.album,
+                                     track.artist,
+                                     track.composer,
+                                     track.genre,
+                                     track.year,
+                                     track.length,
+                                     track.size,
+                                     track.rating,
+                                     track.mtime,
+                                     track.inode,
+                                     track.content_hash
+                                     ) for track_id, track in zip(chunk_ids, chunk)])
+                track_ids.extend(chunk_ids)
+                next_track_id += len(chunk)
+
+        for track_id, track in zip(track_ids, tracks):
+            track.track_id = track_id
+
+        elapsed = time.perf_counter() - start
+        print(f"Added {len(track_ids)} tracks in {elapsed:.6f} ({len(track_ids) / max(elapsed, 1e-9):.0f} rows/s)")
+        return track_ids
+
+    def add_new_tracks(self, tracks: Iterable[Track]) -> List[int]:
+        """Adds tracks whose files aren't in the library yet, neither under their own path nor under another."""
+        existing_file_paths = self.get_file_paths()
         tracks_to_add = []
         for track in tracks:
-            if track not in existing_tracks:
+            if track.file_path not in existing_file_paths:
+                existing_file_paths.add(track.file_path)
                 tracks_to_add.append(track)
-        self.add_tracks(tracks_to_add)
+        return self.add_tracks(self.skip_duplicates(tracks_to_add, self.get_content_hashes()))
 
-    def get_track_counts_grouped_by_key(self, group_key: str) -> List[Tuple[str, int]]:
+    def skip_duplicates(self, tracks: Iterable[Track], content_hashes: Dict[str, str]) -> List[Track]:
+        """Returns tracks whose content isn't in content_hashes under another path that still exists, content_hashes
+        is updated with the returned ones. A file whose original is gone was moved, so it's kept. Skipped copies are
+        recorded with their fingerprints, see get_skipped_duplicates."""
+        unique_tracks, skipped_tracks = [], []
+        for track in tracks:
+            original_file_path = content_hashes.get(track.content_hash)
+            if (original_file_path is not None and original_file_path != track.file_path
+                    and os.path.exists(original_file_path)):
+                print(f"Skipping {track.file_path}, it's a copy of {original_file_path}")
+                skipped_tracks.append((track, original_file_path))
+                continue
+            if track.content_hash is not None:
+                content_hashes[track.content_hash] = track.file_path
+            unique_tracks.append(track)
+
+        conn = self.get_connection()
+        with conn:
+            conn.executemany("INSERT OR REPLACE INTO skipped_duplicates (file_path, original_file_path, mtime, size, "
+                             "inode) VALUES (?, ?, ?, ?, ?)",
+                             [(track.file_path, original_file_path, track.mtime, track.size, track.inode)
+                              for track, original_file_path in skipped_tracks])
+            # a copy that was changed since it was skipped is added now
+            conn.executemany("DELETE FROM skipped_duplicates WHERE file_path = ?",
+                             [(track.file_path,) for track in unique_tracks])
+        return unique_tracks
+
+    def get_skipped_duplicates(self) -> Dict[str, Tuple[str, Optional[int], int, Optional[int]]]:
+        """Returns file_path -> (original_file_path, mtime, size, inode) for every copy skip_duplicates skipped."""
+        conn = self.get_connection()
+        cursor = conn.cursor()
+
+        return {row[0]: row[1:] for row in
+                cursor.execute("SELECT file_path, original_file_path, mtime, size, inode FROM skipped_duplicates")}
+
+    def delete_skipped_duplicates(self, file_paths: Iterable[str]) -> None:
+        conn = self.get_connection()
+        with conn:
+            conn.executemany("DELETE FROM skipped_duplicates WHERE file_path = ?",
+                             [(file_path,) for file_path in file_paths])
+
+    def get_file_paths(self) -> Set[str]:
+        conn = self.get_connection()
+        cursor = conn.cursor()
+
+        return {row[0] for row in cursor.execute("SELECT file_path FROM tracks")}
+
+    def get_file_fingerprints(self) -> Dict[str, Tuple[int, Optional[int], int, Optional[int]]]:
+        """Returns file_path -> (track_id, mtime, size, inode) for every track."""
+        conn = self.get_connection()
+        cursor = conn.cursor()
+
+        return {row[0]: row[1:] for row in
+                cursor.execute("SELECT file_path, track_id, mtime, size, inode FROM tracks")}
+
+    def get_content_hashes(self) -> Dict[str, str]:
+        """Returns content_hash -> file_path, of the first track added with each hash."""
+        conn = self.get_connection()
+        cursor = conn.cursor()
+
+        return {row[0]: row[1] for row in
+                cursor.execute("SELECT content_hash, file_path FROM tracks WHERE content_hash IS NOT NULL "
+                               "ORDER BY track_id DESC")}
+
+    def get_content_hashes_by_ids(self, track_ids: Iterable[int],
+                                  chunk_size: int = BULK_INSERT_CHUNK_SIZE) -> Dict[int, Optional[str]]:
+        """Returns track_id -> content_hash of the given tracks."""
+        track_ids = list(track_ids)
         conn = self.get_connection()
         cursor = conn.cursor()
 
-        if group_key.lower() == "folder":
-            conn.create_function("get_folder_path", 1, lambda s: s.rsplit("/", 1)[0])
-            group_key = "get_folder_path(file_path)"
+        content_hashes = {}
+        for chunk_start in range(0, len(track_ids), chunk_size):
+            chunk = track_ids[chunk_start:chunk_start + chunk_size]
+            content_hashes.update(cursor.execute(f"SELECT track_id, content_hash FROM tracks "
+                                                 f"WHERE track_id IN ({', '.join('?' * len(chunk))})", chunk))
+        return content_hashes
+
+    def get_duplicate_tracks(self, by_metadata: bool = False) -> List[List[Track]]:
+        """Returns groups of tracks with the same content, or with the same artist, title and length with
+        by_metadata, which also catches the same song encoded differently."""
+        if not by_metadata:
+            conn = self.get_connection()
+            cursor = conn.cursor()
+            cursor.row_factory = sqlite3.Row
+            cursor.execute("SELECT * FROM tracks WHERE content_hash IN (SELECT content_hash FROM tracks "
+                           "WHERE content_hash IS NOT NULL GROUP BY content_hash HAVING COUNT(*) > 1) "
+                           "ORDER BY content_hash, track_id")
+            return [[self._row_to_track(row) for row in rows]
+                    for _, rows in itertools.groupby(cursor, key=lambda row: row["content_hash"])]
+
+        groups: Dict[Tuple[str, str, int], List[Track]] = {}
+        for track in self.iter_tracks():
+            if not track.title:
+                continue
+            key = (" ".join((track.artist or "").casefold().split()), " ".join(track.title.casefold().split()),
+                   track.length)
+            groups.setdefault(key, []).append(track)
+        return [tracks for tracks in groups.values() if len(tracks) > 1]
+
+    def get_track_counts_grouped_by_key(self, group_key: str) -> List[Tuple[str, int]]:
+        conn = self.get_connection()
+        cursor = conn.cursor()
 
-        track_counts = cursor.execute(f"SELECT {group_key}, COUNT (*) "
-                                      f"FROM tracks "
-                                      f"GROUP BY {group_key}").fetchall()
+        track_counts = cursor.execute(self.queries.count_grouped_by(group_key)).fetchall()
 
-        conn.close()
         return track_counts
 
     def get_tracks_by(self, key: str, value: Optional[Union[str, int]]) -> List[Track]:
         conn = self.get_connection()
-        conn.row_factory = sqlite3.Row
         cursor = conn.cursor()
+        cursor.row_factory = sqlite3.Row
 
         if value == "all":
             return self.get_tracks()
-        if key.lower() == "folder":
-            conn.create_function("get_folder_path", 1, lambda s: s.rsplit("/", 1)[0])
-            cursor.execute(f"SELECT * FROM tracks WHERE get_folder_path(file_path) = ?", (value, ))
-        elif value:
-            if isinstance(value, str):
-                value = value.replace("'", "''")
-            cursor.execute(f"SELECT * FROM tracks WHERE {key} = '{value}'")
-        else:
-            cursor.execute(f"SELECT * FROM tracks WHERE {key} IS NULL")
-
-        tracks: List[Track] = []
-        rows = cursor.fetchall()
-        for row in rows:
-            track = Track(
-                track_id=row["track_id"],
-                file_path=row["file_path"],
-                title=str(row["title"]),
-                album=row["album"],
-                artist=row["artist"],
-                composer=row["composer"],
-                genre=row["genre"],
-                year=row["year"],
-                length=row["length"],
-                size=row["size"],
-                rating=row["rating"] if row["rating"] else 0
-            )
-            if track.track_id in self._cached_pixmaps:
-                track.artwork_pixmap = self._cached_pixmaps[track.track_id]
-            else:
-                track.artwork_pixmap = get_embedded_artwork_pixmap(track.file_path)
-                self._cached_pixmaps[track.track_id] = track.artwork_pixmap
-
-            tracks.append(track)
-        return tracks
+        cursor.execute(*self.queries.select_where(key, value if value else None))
+
+        return [self._row_to_track(row) for row in cursor.fetchall()]
 
     def get_tracks(self) -> List[Track]:
+        return list(self.iter_tracks())
+
+    def iter_tracks(self, order_by: str = "track_id", where: Optional[Tuple[str, Optional[Union[str, int]]]] = None,
+                    batch_size: int = TRACKS_FETCH_BATCH_SIZE) -> Iterator[Track]:
+        """Yields tracks while rows are fetched batch_size at a time, so the whole table is never held as rows.
+        where is a (column, value) pair, a value of None matches tracks without one."""
         conn = self.get_connection()
-        conn.row_factory = sqlite3.Row
         cursor = conn.cursor()
-        cursor.execute("SELECT * FROM tracks")
-
-        tracks: List[Track] = []
-        for row in cursor.fetchall():
-            track = Track(
-                track_id=row["track_id"],
-                file_path=row["file_path"],
-                title=row["title"],
-                album=row["album"],
-                artist=row["artist"],
-                composer=row["composer"],
-                genre=row["genre"],
-                year=row["year"],
-                length=row["length"],
-                size=row["size"],
-                rating=row["rating"] if row["rating"] else 0
-                )
-
-            if track.track_id in self._cached_pixmaps:
-                track.artwork_pixmap = self._cached_pixmaps[track.track_id]
-            else:
-                track.artwork_pixmap = get_embedded_artwork_pixmap(track.file_path)
-                self._cached_pixmaps[track.track_id] = track.artwork_pixmap
-
-            tracks.append(track)
+        cursor.row_factory = sqlite3.Row
+        cursor.execute(*self.queries.select(where=where, order_by=order_by))
 
+        while rows := cursor.fetchmany(batch_size):
+            for row in rows:
+                yield self._row_to_track(row)
+
+    def get_tracks_by_ids(self, track_ids: Iterable[int], chunk_size: int = BULK_INSERT_CHUNK_SIZE) -> List[Track]:
+        track_ids = list(track_ids)
+        conn = self.get_connection()
+        cursor = conn.cursor()
+        cursor.row_factory = sqlite3.Row
+
+        tracks = []
+        for chunk_start in range(0, len(track_ids), chunk_size):
+            chunk = track_ids[chunk_start:chunk_start + chunk_size]
+            cursor.execute(f"SELECT * FROM tracks WHERE track_id IN ({', '.join('?' * len(chunk))})", chunk)
+            tracks.extend(self._row_to_track(row) for row in cursor.fetchall())
         return tracks
 
+    def get_tracks_page(self, after_key: Optional[int] = None, limit: int = TRACKS_FETCH_BATCH_SIZE,
+                        where: Optional[Tuple[str, Optional[Union[str, int]]]] = None) -> List[Track]:
+        """Returns up to limit tracks ordered by track_id, starting after the track_id passed as after_key. Pass
+        the track_id of the last track of the previous page to get the next one."""
+        conn = self.get_connection()
+        cursor = conn.cursor()
+        cursor.row_factory = sqlite3.Row
+        cursor.execute(*self.queries.select(where=where,
+                                            after=("track_id", after_key) if after_key is not None else None,
+                                            order_by="track_id",
+                                            limit=limit))
+
+        return [self._row_to_track(row) for row in cursor.fetchall()]
+
+    @staticmethod
+    def _row_to_track(row: sqlite3.Row) -> Track:
+        """Builds a Track from metadata only, artwork is loaded on demand by ArtworkRepository. Values shared
+        by many tracks are interned so each distinct album, artist, composer and genre is stored once."""
+        return Track(
+            track_id=row["track_id"],
+            file_path=row["file_path"],
+            title=str(row["title"]),
+            album=_intern(row["album"]),
+            artist=_intern(row["artist"]),
+            composer=_intern(row["composer"]),
+            genre=_intern(row["genre"]),
+            year=row["year"],
+            length=row["length"],
+            size=row["size"],
+            rating=row["rating"] if row["rating"] else 0,
+            mtime=row["mtime"],
+            inode=row["inode"]
+        )
+
     def get_track_count(self) -> int:
         conn = self.get_connection()
         cursor = conn.cursor()
@@ -147,111 +278,51 @@ class TracksRepository(BaseRepository, metaclass=Singleton):
     def delete_track_by(self, key: str, value: Union[int, float, str]) -> None:
         conn = self.get_connection()
         cursor = conn.cursor()
-        cursor.execute(f"DELETE FROM tracks WHERE {key} = ?", (value, ))
+        cursor.execute(self.queries.delete_where(key), (value, ))
         conn.commit()
-        conn.close()
 
-    def update_track(self, track: Track, column: str, value: Union[int, float, str]) -> None:
+    def delete_tracks_bulk(self, tracks: Iterable[Track]) -> None:
         conn = self.get_connection()
-        cursor = conn.cursor()
-        cursor.execute(f"UPDATE tracks SET {column} = ? WHERE track_id = ?", (value, track.track_id))
-        conn.commit()
-        conn.close()
-
-    def update_tracks_by_folder(self, folder_path: str, new_file_paths: List[str]) -> Tuple[List[Track], List[Track]]:
-        """Adds new tracks to database if they're already not there and removes tracks from database
-        if they're not in new tracks."""
-        tracks_in_database = self.get_tracks_by("folder", folder_path)
-        file_paths_in_database = [track.file_path for track in tracks_in_database]
-
-        if not tracks_in_database:
-            to_add = new_file_paths
-            to_remove = []
-        else:
-            if isinstance(file_paths_in_database[0], tuple):
-                file_paths_in_database = [track[0] for track in file_paths_in_database]
-
-            to_add = list(set(new_file_paths) - set(file_paths_in_database))
-            to_remove = list(set(file_paths_in_database) - set(new_file_paths))
+        with conn:
+            conn.executemany("DELETE FROM tracks WHERE track_id = ?", [(track.track_id, ) for track in tracks])
 
-        # print("FOLDER:", folder_path)
-        # print("CURRENTLY IN FOLDER:", new_file_paths)
-        # print("NEW FILE PATHS:", set(new_file_paths))
-        # print("IN DATABASE:", set(file_paths_in_database))
-        # print("TO ADD:", to_add)
-        # print("TO REMOVE:", to_remove)
-
-        tracks_to_add = self.convert_file_paths_to_tracks(to_add)
-        tracks_to_remove = [track for track in tracks_in_database if track.file_path in to_remove]
-
-        self.add_tracks(tracks_to_add)
+    def update_track(self, track: Track, column: str, value: Union[int, float, str]) -> None:
+        self.update_tracks_bulk(column, {track.track_id: value})
 
-        for file_path_to_remove in to_remove:
-            self.delete_track_by("file_path", file_path_to_remove)
+    def update_tracks_bulk(self, column: str, values: Dict[int, Union[int, float, str]]) -> None:
+        """Sets column to the given value for every track_id in values."""
+        conn = self.get_connection()
+        with conn:
+            conn.executemany(self.queries.update_column_where(column, "track_id"),
+                             [(value, track_id) for track_id, value in values.items()])
 
-        return tracks_to_add, tracks_to_remove
+    def update_tracks_metadata(self, tracks: Iterable[Track]) -> None:
+        """Rewrites everything read from the files of already added tracks, the rating is kept since it's only
+        stored in the database."""
+        conn = self.get_connection()
+        with conn:
+            conn.executemany("UPDATE tracks SET title = ?, album = ?, artist = ?, composer = ?, genre = ?, year = ?, "
+                             "length = ?, size = ?, mtime = ?, inode = ?, content_hash = ? WHERE track_id = ?",
+                             [(track.title,
+                               track.album,
+                               track.artist,
+                               track.composer,
+                               track.genre,
+                               track.year,
+                               track.length,
+                               track.size,
+                               track.mtime,
+                               track.inode,
+                               track.content_hash,
+                               track.track_id
+                               ) for track in tracks])
 
     @staticmethod
     def convert_file_paths_to_tracks(file_paths: List[str]) -> List[Track]:
         converted_tracks = []
-        for i, file_path in enumerate(file_paths):
-            print(file_path)
-            if not os.path.splitext(file_path)[-1] in SUPPORTED_AUDIO_FORMATS:
-                continue
-
-            audio_file: eyed3.AudioFile = eyed3.load(file_path)
-
-            if not audio_file.tag:
-                audio_file.initTag()
-
-            title = audio_file.tag.title
-            artist = audio_file.tag.artist
-            if not title and not artist:
-                title = os.path.splitext(os.path.basename(file_path))[0]
-                split = title.split(" - ", 1)
-                if len(split) == 2:
-                    artist, title = split
-                else:
-                    title = split[0]
-                if artist:
-                    artist = artist.strip()
-                title = title.strip()
-            elif not title:
-                title = os.path.splitext(os.path.basename(file_path))[0]
-            elif not artist:
-                pass
-
-            rating = None
-            for popm in audio_file.tag.popularities:
-                if popm.rating:
-                    if popm.rating == 255:
-                        rating = 5
-                    elif popm.rating >= 186:
-                        rating = 4
-                    elif popm.rating >= 128:
-                        rating = 3
-                    elif popm.rating >= 64:
-                        rating = 2
-                    elif popm.rating >= 32:
-                        rating = 1
-                    else:
-                        rating = 0
-                    break
-
-            tr = Track(
-                i,  # temporary id
-                file_path,
-                str(title),
-                audio_file.tag.album,
-                artist,
-                audio_file.tag.composer,
-                audio_file.tag.genre,
-                audio_file.tag.recording_date.year if audio_file.tag.recording_date else None,
-                int(audio_file.info.time_secs),
-                int(audio_file.info.size_bytes),
-                rating if rating else 0,
-                get_embedded_artwork_pixmap(file_path) if QApplication.instance() else None
-            )
-            converted_tracks.append(tr)
+        for tracks in TagReader().read_tracks(file_paths):
+            converted_tracks.extend(tracks)
 
+        for i, track in enumerate(converted_tracks):
+            track.track_id = i  # temporary id
         return converted_tracks
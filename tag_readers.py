@@ -0,0 +1,253 @@
+# Tag reading processes are spawned and import only this module, so it mustn't import anything that loads Qt,
+# which rules out constants and the utils package.
+import hashlib
+import os
+import time
+from dataclasses import dataclass, field
+from typing import Callable, Collection, Dict, List, Optional, Tuple
+
+import eyed3
+import mutagen
+import mutagen.id3
+import mutagen.mp3
+import mutagen.mp4
+import mutagen.wave
+
+from data_models.track import Track
+
+TagReaderFunction = Callable[[str, os.stat_result], Optional[Track]]
+
+# lowercase extension -> function reading a file's tags into a Track
+_tag_readers: Dict[str, TagReaderFunction] = {}
+
+
+def register_tag_reader(*extensions: str) -> Callable[[TagReaderFunction], TagReaderFunction]:
+    """Decorator registering a reader for files with the extensions. A reader returns None for files it can't
+    read, extensions also have to be in SUPPORTED_AUDIO_FORMATS to be imported."""
+    def register(reader: TagReaderFunction) -> TagReaderFunction:
+        for extension in extensions:
+            _tag_readers[extension.lower()] = reader
+        return reader
+    return register
+
+
+def read_track(file_path: str, supported_formats: Collection[str], content_hash_chunk_size: int) -> Optional[Track]:
+    """Reads a track's metadata from its tags with the reader registered for its extension. Returns None for
+    unsupported or unreadable files."""
+    extension = os.path.splitext(file_path)[-1].lower()
+    reader = _tag_readers.get(extension)
+    if reader is None or extension not in supported_formats:
+        return None
+
+    stat = os.stat(file_path)
+    track = reader(file_path, stat)
+    if track is not None:
+        track.content_hash = get_content_hash(file_path, stat.st_size, content_hash_chunk_size)
+    return track
+
+
+def get_content_hash(file_path: str, size: int, chunk_size: int) -> str:
+    """Hashes the size along with the start and the end of the file. Reading only those is enough to tell
+    copies of a file apart from other files, without reading the whole audio stream."""
+    content_hash = hashlib.blake2b(size.to_bytes(8, "little"), digest_size=16)
+    with open(file_path, "rb") as f:
+        content_hash.update(f.read(chunk_size))
+        if size > 2 * chunk_size:
+            f.seek(-chunk_size, os.SEEK_END)
+        content_hash.update(f.read(chunk_size))
+    return content_hash.hexdigest()
+
+
+@register_tag_reader(".mp3")
+def read_mp3(file_path: str, stat: os.stat_result) -> Optional[Track]:
+    """mutagen only reads the ID3 tag and the first MPEG frame, taking the duration from its Xing/VBRI header or
+    estimating it from the bitrate. eyed3, which parses the whole audio stream, is used only when that fails."""
+    try:
+        track = read_mp3_with_mutagen(file_path, stat)
+    except mutagen.MutagenError:
+        track = None
+    return track or read_mp3_with_eyed3(file_path, stat)
+
+
+def read_mp3_with_mutagen(file_path: str, stat: os.stat_result) -> Optional[Track]:
+    audio_file = mutagen.mp3.MP3(file_path)
+    if audio_file.info.length <= 0:
+        return None
+
+    return _create_track_from_id3(file_path, stat, audio_file.tags, audio_file.info.length)
+
+
+def read_mp3_with_eyed3(file_path: str, stat: os.stat_result) -> Optional[Track]:
+    audio_file: eyed3.AudioFile = eyed3.load(file_path)
+    if audio_file is None:
+        return None
+
+    if not audio_file.tag:
+        audio_file.initTag()
+
+    return _create_track(file_path, stat, audio_file.tag.title, audio_file.tag.album, audio_file.tag.artist,
+                         audio_file.tag.composer, audio_file.tag.genre.name if audio_file.tag.genre else None,
+                         audio_file.tag.recording_date.year if audio_file.tag.recording_date else None,
+                         audio_file.info.time_secs, [popm.rating for popm in audio_file.tag.popularities])
+
+
+@register_tag_reader(".wav")
+def read_wav(file_path: str, stat: os.stat_result) -> Optional[Track]:
+    audio_file = mutagen.wave.WAVE(file_path)
+    return _create_track_from_id3(file_path, stat, audio_file.tags, audio_file.info.length)
+
+
+@register_tag_reader(".flac", ".ogg", ".opus")
+def read_vorbis_comments(file_path: str, stat: os.stat_result) -> Optional[Track]:
+    """FLAC and Ogg (Vorbis, Opus, FLAC) files, all tagged with Vorbis comments."""
+    audio_file = mutagen.File(file_path)
+    if audio_file is None:
+        return None
+    tags = audio_file.tags or {}
+
+    def text(key: str) -> Optional[str]:
+        values = tags.get(key)
+        return values[0] if values else None
+
+    # FMPS_RATING goes from 0.0 to 1.0
+    try:
+        popularities = [round(float(text("fmps_rating")) * 255)] if text("fmps_rating") else []
+    except ValueError:
+        popularities = []
+
+    return _create_track(file_path, stat, text("title"), text("album"), text("artist"), text("composer"),
+                         text("genre"), _parse_year(text("date")), audio_file.info.length, popularities)
+
+
+@register_tag_reader(".m4a")
+def read_mp4(file_path: str, stat: os.stat_result) -> Optional[Track]:
+    audio_file = mutagen.mp4.MP4(file_path)
+    tags = audio_file.tags or {}
+
+    def text(key: str) -> Optional[str]:
+        values = tags.get(key)
+        return str(values[0]) if values else None
+
+    return _create_track(file_path, stat, text("\xa9nam"), text("\xa9alb"), text("\xa9ART"), text("\xa9wrt"),
+                         text("\xa9gen"), _parse_year(text("\xa9day")), audio_file.info.length, [])
+
+
+def _create_track_from_id3(file_path: str, stat: os.stat_result, tags: Optional[mutagen.id3.ID3],
+                           length: float) -> Track:
+    tags = tags or mutagen.id3.ID3()
+
+    def text(frame_id: str) -> Optional[str]:
+        frame = tags.get(frame_id)
+        return str(frame.text[0]) if frame and frame.text else None
+
+    # genres resolves ID3v1 genre numbers like "(17)" to their names
+    genre = tags.get("TCON")
+    genre = ", ".join(genre.genres) if genre and genre.genres else None
+    recording_date = tags.get("TDRC")
+    year = recording_date.text[0].year if recording_date and recording_date.text else None
+    popularities = [popm.rating for popm in tags.getall("POPM")]
+
+    return _create_track(file_path, stat, text("TIT2"), text("TALB"), text("TPE1"), text("TCOM"), genre, year,
+                         length, popularities)
+
+
+def _parse_year(date: Optional[str]) -> Optional[int]:
+    return int(date[:4]) if date and date[:4].isdigit() else None
+
+
+def _create_track(file_path: str, stat: os.stat_result, title: Optional[str], album: Optional[str],
+                  artist: Optional[str], composer: Optional[str], genre: Optional[str], year: Optional[int],
+                  length: float, popularities: List[int]) -> Track:
+    if not title and not artist:
+        title = os.path.splitext(os.path.basename(file_path))[0]
+        split = title.split(" - ", 1)
+        if len(split) == 2:
+            artist, title = split
+        else:
+            title = split[0]
+        if artist:
+            artist = artist.strip()
+        title = title.strip()
+    elif not title:
+        title = os.path.splitext(os.path.basename(file_path))[0]
+
+    rating = None
+    for popm_rating in popularities:
+        if popm_rating:
+            if popm_rating == 255:
+                rating = 5
+            elif popm_rating >= 186:
+                rating = 4
+            elif popm_rating >= 128:
+                rating = 3
+            elif popm_rating >= 64:
+                rating = 2
+            elif popm_rating >= 32:
+                rating = 1
+            else:
+                rating = 0
+            break
+
+    return Track(
+        0,  # assigned when the track is added to the database
+        file_path,
+        str(title),
+        album,
+        artist,
+        composer,
+        genre,
+        year,
+        int(length),
+        stat.st_size,
+        rating if rating else 0,
+        mtime=stat.st_mtime_ns,
+        inode=stat.st_ino
+    )
+
+
+@dataclass
+class FormatStats:
+    files: int = 0
+    failures: int = 0
+    seconds: float = 0.0
+
+    @property
+    def files_per_second(self) -> float:
+        return self.files / self.seconds if self.seconds else 0.0
+
+
+@dataclass
+class TagReadingStats:
+    """Time spent reading tags per file extension, so slow formats stand out."""
+    formats: Dict[str, FormatStats] = field(default_factory=dict)
+
+    def add(self, extension: str, seconds: float, failed: bool = False) -> None:
+        format_stats = self.formats.setdefault(extension, FormatStats())
+        format_stats.files += 1
+        format_stats.failures += failed
+        format_stats.seconds += seconds
+
+    def merge(self, other: "TagReadingStats") -> None:
+        for extension, other_stats in other.formats.items():
+            format_stats = self.formats.setdefault(extension, FormatStats())
+            format_stats.files += other_stats.files
+            format_stats.failures += other_stats.failures
+            format_stats.seconds += other_stats.seconds
+
+
+def read_tracks_batch(file_paths: List[str], supported_formats: Collection[str],
+                      content_hash_chunk_size: int) -> Tuple[List[Track], TagReadingStats]:
+    """Worker entry point, a file that can't be read is skipped instead of failing the whole batch."""
+    tracks = []
+    stats = TagReadingStats()
+    for file_path in file_paths:
+        start = time.perf_counter()
+        try:
+            track = read_track(file_path, supported_formats, content_hash_chunk_size)
+        except Exception as e:
+            print(f"Could not read tags of {file_path}: {e}")
+            track = None
+        if track:
+            tracks.append(track)
+        stats.add(os.path.splitext(file_path)[-1].lower(), time.perf_counter() - start, failed=track is None)
+    return tracks, stats
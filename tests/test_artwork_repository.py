@@ -0,0 +1,82 @@
+import os
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+from mutagen.id3 import ID3, APIC
+from PyQt6.QtCore import QBuffer, QByteArray
+from PyQt6.QtGui import QColor, QGuiApplication, QImage
+
+from constants import ARTWORK_THUMBNAIL_SIZES
+from database.database_manipulation import setup_artwork_cache_database
+from repositories import ArtworkRepository
+from repositories.connection_manager import ConnectionManager
+
+application = QGuiApplication.instance() or QGuiApplication([])
+
+
+def write_track_with_artwork(file_path: str) -> None:
+    image = QImage(64, 64, QImage.Format.Format_RGB32)
+    image.fill(QColor("red"))
+    data = QByteArray()
+    buffer = QBuffer(data)
+    buffer.open(QBuffer.OpenModeFlag.WriteOnly)
+    image.save(buffer, "PNG")
+
+    tags = ID3()
+    tags.add(APIC(encoding=3, mime="image/png", type=3, desc="", data=bytes(data)))
+    tags.save(file_path)
+
+
+class ArtworkRepositoryTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.track_path = os.path.join(self.directory, "track.mp3")
+        write_track_with_artwork(self.track_path)
+
+        self.connection_manager = ArtworkRepository.connection_manager
+        ArtworkRepository.connection_manager = ConnectionManager(os.path.join(self.directory, "artwork_cache.db"),
+                                                                 setup_artwork_cache_database)
+        ArtworkRepository.instance = None
+
+    def tearDown(self):
+        ArtworkRepository.close_connections()
+        ArtworkRepository.connection_manager = self.connection_manager
+        ArtworkRepository.instance = None
+        shutil.rmtree(self.directory)
+
+    def test_fresh_repository_caches_thumbnails_in_view_sizes(self):
+        artwork_repository = ArtworkRepository()
+        artwork_repository.cache_thumbnails(self.track_path)
+
+        rows = artwork_repository.get_connection().execute("SELECT size FROM thumbnails WHERE file_path = ?",
+                                                           (self.track_path,)).fetchall()
+        device_pixel_ratio = application.primaryScreen().devicePixelRatio()
+        self.assertEqual({row[0] for row in rows},
+                         {round(size * device_pixel_ratio) for size in ARTWORK_THUMBNAIL_SIZES})
+
+        artwork_repository.clear_cache()
+        self.assertIsNotNone(artwork_repository.get_artwork_pixmap(self.track_path, ARTWORK_THUMBNAIL_SIZES[0],
+                                                                   device_pixel_ratio))
+        self.assertEqual(artwork_repository.stats.disk_hits, 1)
+        self.assertEqual(artwork_repository.stats.misses, 0)
+
+    def test_missing_file_is_statted_once_until_forgotten(self):
+        artwork_repository = ArtworkRepository()
+        missing_path = os.path.join(self.directory, "missing.mp3")
+
+        with mock.patch("repositories.artwork_repository.os.stat", side_effect=os.stat) as stat:
+            for _ in range(3):
+                self.assertIsNone(artwork_repository.get_artwork_pixmap(missing_path, 20))
+        self.assertEqual(stat.call_count, 1)
+
+        shutil.copy(self.track_path, missing_path)
+        self.assertIsNone(artwork_repository.get_artwork_pixmap(missing_path, 20))
+        artwork_repository.forget_missing_files([missing_path])
+        self.assertIsNotNone(artwork_repository.get_artwork_pixmap(missing_path, 20))
+
+if __name__ == "__main__":
+    unittest.main()
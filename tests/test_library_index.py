@@ -0,0 +1,32 @@
+import unittest
+
+from data_models import Track
+from repositories.library_index import LibraryIndex
+
+
+def create_track(track_id: int, album: str) -> Track:
+    return Track(track_id, f"/music/{track_id}.mp3", str(track_id), album, "Artist", "", "", 2000, 100, 1000)
+
+
+class LibraryIndexTest(unittest.TestCase):
+    def setUp(self):
+        self.library_index = LibraryIndex([create_track(track_id, "A") for track_id in (1, 3, 5)], ("album",))
+
+    def test_replaced_track_keeps_its_place(self):
+        self.library_index.replace(create_track(1, "B"))
+
+        self.assertEqual([track.track_id for track in self.library_index.get_tracks()], [1, 3, 5])
+        self.assertEqual([track.track_id for track in self.library_index.get_tracks_by("album", "A")], [3, 5])
+        self.assertEqual([track.track_id for track in self.library_index.get_tracks_by("album", "B")], [1])
+
+    def test_added_tracks_come_out_in_id_order(self):
+        self.library_index.add(create_track(6, "A"))
+        self.library_index.add(create_track(2, "A"))
+
+        self.assertEqual([track.track_id for track in self.library_index.get_tracks()], [1, 2, 3, 5, 6])
+        self.assertEqual([track.track_id for track in self.library_index.get_tracks_by("album", "A")],
+                         [1, 2, 3, 5, 6])
+
+
+if __name__ == "__main__":
+    unittest.main()
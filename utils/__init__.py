@@ -1,9 +1,12 @@
 from .buttons import *
+from .directory_crawler import DirectoryCrawler, normalize_path
 from .fixed_horizontal_splitter import FixedHorizontalSplitter
 from .image_downloader import ImageDownloader
 from .improved_slider import ImprovedSlider
 from .labels import *
 from .misc import *
 from .pixmaps import *
+from .tag_reader import TagReader, read_track, register_tag_reader
 from .time_formatting import *
+from .track_search_index import TrackSearchIndex
 from .transparent_combo_box import TransparentComboBox
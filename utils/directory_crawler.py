@@ -0,0 +1,71 @@
+import concurrent.futures
+import os
+from typing import Iterable, Iterator, List, Optional, Set, Tuple
+
+import constants
+
+
+def normalize_path(path: str) -> str:
+    """Absolute path with forward slashes, the form file paths are stored in. A folder like "/Music" resolves
+    to the current drive on Windows."""
+    path = os.path.abspath(path).replace("\\", "/")
+    return path if path.endswith(":/") or path == "/" else path.rstrip("/")
+
+
+def scan_directory(directory: str, extensions: Set[str]) -> Tuple[List[os.DirEntry], List[str]]:
+    """Returns entries of files with one of the extensions and paths of subdirectories. The entries' stat results
+    are fetched here, so they're cached on the entries when they're read later."""
+    files, subdirectories = [], []
+    try:
+        with os.scandir(directory) as entries:
+            for entry in entries:
+                try:
+                    if entry.is_dir(follow_symlinks=False):
+                        subdirectories.append(f"{directory.rstrip('/')}/{entry.name}")
+                    elif os.path.splitext(entry.name)[-1].lower() in extensions:
+                        entry.stat()
+                        files.append(entry)
+                except OSError as e:
+                    print(e)
+    except OSError as e:
+        print(e)
+    return files, subdirectories
+
+
+class DirectoryCrawler:
+    """Walks folders with os.scandir, independent subtrees are scanned concurrently in a thread pool. Directories
+    are yielded as soon as they're scanned, not in any particular order, so their files can be processed before
+    the walk finishes."""
+
+    def __init__(self, extensions: Optional[Iterable[str]] = None, workers: Optional[int] = None):
+        self.extensions = set(extensions) if extensions is not None else constants.SUPPORTED_AUDIO_FORMATS
+        self.workers = workers or constants.DIRECTORY_CRAWLER_WORKERS
+
+    def crawl(self, folders: Iterable[str]) -> Iterator[Tuple[str, List[os.DirEntry]]]:
+        """Yields (folder, entries) for every directory under the folders, including ones without matching files.
+        Folder paths are normalized, folders that don't exist are skipped."""
+        folders = [normalize_path(folder) for folder in folders]
+        folders = [folder for folder in dict.fromkeys(folders) if os.path.isdir(folder)]
+
+        if self.workers == 1:
+            while folders:
+                folder = folders.pop()
+                files, subdirectories = scan_directory(folder, self.extensions)
+                folders += subdirectories
+                yield folder, files
+            return
+
+        executor = concurrent.futures.ThreadPoolExecutor(self.workers)
+        try:
+            pending = {executor.submit(scan_directory, folder, self.extensions): folder for folder in folders}
+            while pending:
+                done, _ = concurrent.futures.wait(pending, return_when=concurrent.futures.FIRST_COMPLETED)
+                for future in done:
+                    folder = pending.pop(future)
+                    files, subdirectories = future.result()
+                    for subdirectory in subdirectories:
+                        pending[executor.submit(scan_directory, subdirectory, self.extensions)] = subdirectory
+                    yield folder, files
+        finally:
+            # directories that haven't been scanned yet are dropped if the caller stops early
+            executor.shutdown(cancel_futures=True)
@@ -1,12 +1,13 @@
+import base64
 import io
 import os
-from typing import Optional
+from typing import List, Optional
 
 import mutagen
+import mutagen.flac
 import mutagen.id3
 import mutagen.mp4
 from PIL import Image, ImageFilter
-from PIL.ImageQt import ImageQt
 from PyQt6.QtCore import QBuffer
 from PyQt6.QtGui import QPixmap, QImage
 from PyQt6.QtWidgets import QApplication
@@ -15,28 +16,49 @@ from utils import get_project_root
 
 
 def get_embedded_artwork_pixmap(file_path: str) -> Optional[QPixmap]:
-    class NoArtworkError(Exception):
-        pass
-
     if not QApplication.instance():
         return
 
-    pixmap = QPixmap()
+    image = get_embedded_artwork_image(file_path)
+    return QPixmap.fromImage(image) if image else None
+
+
+def get_embedded_artwork_image(file_path: str) -> Optional[QImage]:
+    """Unlike QPixmap, QImage can be used outside the GUI thread."""
+    extension = os.path.splitext(file_path)[-1].lower()
     try:
-        try:
-            file_id3 = mutagen.id3.ID3(file_path)
-            artwork = file_id3.getall("APIC")[0]
-            pixmap.loadFromData(artwork.data)
-        except (mutagen.id3.ID3NoHeaderError, IndexError):
+        if extension == ".flac":
+            data = _get_front_cover(mutagen.flac.FLAC(file_path).pictures)
+        elif extension in (".ogg", ".opus"):
+            # Vorbis comments hold base64 encoded FLAC picture blocks
+            file_ogg = mutagen.File(file_path)
+            data = _get_front_cover([mutagen.flac.Picture(base64.b64decode(block))
+                                     for block in (file_ogg.tags or {}).get("metadata_block_picture", [])])
+        else:
             try:
-                file_xmp = mutagen.mp4.MP4(file_path)
-                artwork = file_xmp.tags["covr"]
-                pixmap = QPixmap.fromImage(ImageQt(artwork))
-            except (mutagen.mp4.MP4StreamInfoError, KeyError):
-                raise NoArtworkError
-    except (AttributeError, NoArtworkError, mutagen.MutagenError, TypeError):
+                file_id3 = mutagen.id3.ID3(file_path)
+                data = file_id3.getall("APIC")[0].data
+            except (mutagen.id3.ID3NoHeaderError, IndexError):
+                try:
+                    file_xmp = mutagen.mp4.MP4(file_path)
+                    data = bytes(file_xmp.tags["covr"][0])
+                except (mutagen.mp4.MP4StreamInfoError, KeyError, IndexError):
+                    return None
+    except (AttributeError, mutagen.MutagenError, TypeError, ValueError):
         return None
-    return pixmap
+    if not data:
+        return None
+
+    image = QImage.fromData(data)
+    return None if image.isNull() else image
+
+
+def _get_front_cover(pictures: List[mutagen.flac.Picture]) -> Optional[bytes]:
+    """Data of the front cover, or of the first picture if none is marked as the front cover."""
+    for picture in pictures:
+        if picture.type == mutagen.id3.PictureType.COVER_FRONT:
+            return picture.data
+    return pictures[0].data if pictures else None
 
 
 def get_default_artwork_pixmap(default_type: str) -> QPixmap:
@@ -62,3 +84,10 @@ def get_blurred_pixmap(pixmap: QPixmap) -> QPixmap:
     qim = QImage(data, blur_img.size[0], blur_img.size[1], QImage.Format.Format_ARGB32)
 
     return QPixmap.fromImage(qim)
+
+
+def get_banner_pixmap(pixmap: QPixmap, height: int) -> QPixmap:
+    """Blurs the pixmap and crops a strip of the given height from its lower part."""
+    pixmap = get_blurred_pixmap(pixmap)
+    start_y = int(pixmap.height() // 1.5)
+    return pixmap.copy(0, start_y, pixmap.width(), height)
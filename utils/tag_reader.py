@@ -0,0 +1,127 @@
+import concurrent.futures
+import functools
+import itertools
+import multiprocessing
+import os
+import sys
+import time
+from collections import deque
+from concurrent.futures.process import BrokenProcessPool
+from typing import Callable, Deque, Iterable, Iterator, List, Optional, Tuple
+
+import constants
+import tag_readers
+from data_models.track import Track
+from tag_readers import (TagReadingStats, get_content_hash, read_mp3, read_mp3_with_eyed3, read_tracks_batch,
+                         register_tag_reader)
+
+
+def read_track(file_path: str) -> Optional[Track]:
+    """Reads a track's metadata from its tags with the reader registered for its extension. Returns None for
+    unsupported or unreadable files."""
+    return tag_readers.read_track(file_path, constants.SUPPORTED_AUDIO_FORMATS, constants.CONTENT_HASH_CHUNK_SIZE)
+
+
+class TagReader:
+    """Reads tags of many files in parallel. Batches of paths are parsed in a process pool, falling back to
+    a thread pool when processes can't be used (frozen builds, pools that fail to start or break)."""
+
+    def __init__(self, workers: Optional[int] = None, batch_size: Optional[int] = None, use_processes: bool = True):
+        self.workers = workers or constants.TAG_READER_WORKERS or os.cpu_count() or 1
+        self.batch_size = batch_size or constants.TAG_READER_BATCH_SIZE
+        self.use_processes = use_processes and not getattr(sys, "frozen", False)
+        self.stats = TagReadingStats()
+
+    def read_tracks(self, file_paths: Iterable[str]) -> Iterator[List[Track]]:
+        """Yields tracks in chunks, in the same order as file_paths. Paths are consumed lazily, so they can come
+        from a directory walk that's still running. Artwork isn't read, it's extracted into the thumbnail cache
+        once the tracks are committed."""
+        start = time.perf_counter()
+        track_count = 0
+        for tracks, stats in self._read_batches(self._iter_batches(file_paths)):
+            self.stats.merge(stats)
+            track_count += len(tracks)
+            yield tracks
+
+        elapsed = time.perf_counter() - start
+        print(f"Read tags of {track_count} files in {elapsed:.6f} ({track_count / max(elapsed, 1e-9):.0f} files/s)")
+        for extension, format_stats in sorted(self.stats.formats.items()):
+            print(f"    {extension}: {format_stats.files} files ({format_stats.failures} unreadable) "
+                  f"in {format_stats.seconds:.6f} of worker time ({format_stats.files_per_second:.0f} files/s)")
+
+    def _iter_batches(self, file_paths: Iterable[str]) -> Iterator[List[str]]:
+        file_paths = iter(file_paths)
+        while batch := list(itertools.islice(file_paths, self.batch_size)):
+            yield batch
+
+    def _read_batches(self, batches: Iterator[List[str]]) -> Iterator[Tuple[List[Track], TagReadingStats]]:
+        read_batch = functools.partial(read_tracks_batch, supported_formats=constants.SUPPORTED_AUDIO_FORMATS,
+                                       content_hash_chunk_size=constants.CONTENT_HASH_CHUNK_SIZE)
+        first_batches = list(itertools.islice(batches, 2))
+        if len(first_batches) <= 1 or self.workers == 1:
+            # not worth starting a pool for
+            yield from map(read_batch, itertools.chain(first_batches, batches))
+            return
+        batches = itertools.chain(first_batches, batches)
+
+        # batches submitted to a pool that broke are read again by the thread pool
+        unfinished: Deque[List[str]] = deque()
+        if self.use_processes:
+            try:
+                # forking a process that runs Qt threads isn't safe, workers are spawned and only import
+                # tag_readers
+                executor = concurrent.futures.ProcessPoolExecutor(
+                    self.workers, mp_context=multiprocessing.get_context("spawn"))
+                yield from self._map_batches(executor, read_batch, batches, unfinished)
+                return
+            except (BrokenProcessPool, OSError) as e:
+                print(f"Process pool unavailable, reading tags in threads: {e}")
+
+        yield from self._map_batches(concurrent.futures.ThreadPoolExecutor(self.workers), read_batch,
+                                     itertools.chain(list(unfinished), batches), deque())
+
+    def _map_batches(self, executor: concurrent.futures.Executor,
+                     read_batch: Callable[[List[str]], Tuple[List[Track], TagReadingStats]],
+                     batches: Iterator[List[str]],
+                     unfinished: Deque[List[str]]) -> Iterator[Tuple[List[Track], TagReadingStats]]:
+        """Like executor.map, but only keeps a couple of batches per worker in flight instead of consuming all
+        of them up front."""
+        futures: Deque[concurrent.futures.Future] = deque()
+        try:
+            for batch in batches:
+                futures.append(executor.submit(read_batch, batch))
+                unfinished.append(batch)
+                if len(futures) >= 2 * self.workers:
+                    yield self._pop_result(futures, unfinished)
+            while futures:
+                yield self._pop_result(futures, unfinished)
+        finally:
+            # batches that haven't started yet are dropped if the caller stops reading early
+            executor.shutdown(cancel_futures=True)
+
+    @staticmethod
+    def _pop_result(futures: Deque[concurrent.futures.Future],
+                    unfinished: Deque[List[str]]) -> Tuple[List[Track], TagReadingStats]:
+        # a batch stays unfinished until its result is in, so it can be read again if the pool breaks
+        result = futures[0].result()
+        futures.popleft()
+        unfinished.popleft()
+        return result
+
+
+if __name__ == '__main__':
+    # python -m utils.tag_reader <folder with mp3 files>
+    folder = sys.argv[1]
+    file_paths = [f"{folder}/{name}" for name in sorted(os.listdir(folder))
+                  if os.path.splitext(name)[-1].lower() == ".mp3"]
+
+    # tags are parsed and content hashed separately, so the parsers are compared on their own
+    for name, reader in (("eyed3 only", lambda path: read_mp3_with_eyed3(path, os.stat(path))),
+                         ("mutagen with eyed3 fallback", lambda path: read_mp3(path, os.stat(path))),
+                         ("content hash", lambda path: get_content_hash(path, os.stat(path).st_size,
+                                                                        constants.CONTENT_HASH_CHUNK_SIZE))):
+        start = time.perf_counter()
+        for file_path in file_paths:
+            reader(file_path)
+        elapsed = time.perf_counter() - start
+        print(f"{name}: {len(file_paths)} files in {elapsed:.3f} s ({len(file_paths) / elapsed:.0f} files/s)")
@@ -0,0 +1,206 @@
+import bisect
+import re
+import threading
+from collections import OrderedDict
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+import constants
+from data_models import Track
+
+WORD_PATTERN = re.compile(r"\w+")
+
+
+def get_words(text: str) -> List[str]:
+    return WORD_PATTERN.findall(text.casefold())
+
+
+class TrackSearchIndex:
+    """Type-ahead search over the tracks' text fields. A track matches a query if every word of the query is the
+    start of one of the track's words, so "beat abb" finds The Beatles' Abbey Road.
+
+    Every word has a posting set of the ids of the tracks containing it. Words are kept sorted, so the words
+    starting with a query word are found with a binary search, and the query's result is the intersection of the
+    unions of their posting sets. Those of one and two character prefixes are the largest, so they're kept up to
+    date as tracks are added and removed, longer ones are cached.
+
+    The index can be built on another thread, every other method waits until it's built."""
+    SEARCH_FIELDS = ("artist", "title", "album", "genre", "composer")
+
+    def __init__(self, tracks: Optional[Iterable[Track]] = None):
+        self._track_words: Dict[int, Tuple[str, ...]] = {}
+        self._word_ids: Dict[str, Set[int]] = {}
+        self._words: List[str] = []
+        self._short_prefix_ids: Dict[str, Set[int]] = {}
+        # prefix of three or more characters, ids of the tracks with a word starting with it
+        self._prefix_ids: OrderedDict[str, Set[int]] = OrderedDict()
+
+        self._last_query = ""
+        self._last_ids: Set[int] = set()
+
+        self._lock = threading.Lock()
+        self._built = threading.Event()
+        if tracks is not None:
+            self.build(tracks)
+
+    def build(self, tracks: Iterable[Track]) -> None:
+        with self._lock:
+            try:
+                self._add_tracks(tracks)
+            except Exception as e:
+                print(f"Could not build the search index: {e}")
+                raise
+            finally:
+                # a failed build leaves the tracks indexed so far, methods waiting for it mustn't hang
+                self._built.set()
+
+    def add_tracks(self, tracks: Iterable[Track]) -> None:
+        """Adds tracks or indexes their fields again if they're already in the index."""
+        self._built.wait()
+        with self._lock:
+            self._add_tracks(tracks)
+
+    def remove_tracks(self, tracks: Iterable[Track]) -> None:
+        self._built.wait()
+        with self._lock:
+            self._remove_track_ids([track.track_id for track in tracks])
+
+    def search(self, query: str) -> Optional[Set[int]]:
+        """Returns ids of the matching tracks, None if the query has no words. The set must not be modified."""
+        query_words = get_words(query)
+        self._built.wait()
+        with self._lock:
+            if not query_words:
+                self._last_query = ""
+                return None
+            if query_words == get_words(self._last_query):
+                return self._last_ids
+
+            id_sets = [self._get_prefix_ids(word) for word in dict.fromkeys(query_words)]
+            if self.narrows(query, self._last_query):
+                # typing usually extends the query, so the last result is the smallest set to start from
+                id_sets.append(self._last_ids)
+            id_sets.sort(key=len)
+            ids = id_sets[0].intersection(*id_sets[1:]) if len(id_sets) > 1 else id_sets[0]
+
+            self._last_query = query
+            self._last_ids = ids
+            return ids
+
+    def _add_tracks(self, tracks: Iterable[Track]) -> None:
+        tracks = list(tracks)
+        self._remove_track_ids([track.track_id for track in tracks if track.track_id in self._track_words])
+
+        new_words = []
+        for track in tracks:
+            words = tuple(dict.fromkeys(get_words(" ".join(getattr(track, field) or ""
+                                                           for field in self.SEARCH_FIELDS))))
+            self._track_words[track.track_id] = words
+            for word in words:
+                ids = self._word_ids.get(word)
+                if ids is None:
+                    ids = self._word_ids[word] = set()
+                    new_words.append(word)
+                ids.add(track.track_id)
+            for prefix in self._get_short_prefixes(words):
+                ids = self._short_prefix_ids.get(prefix)
+                if ids is None:
+                    ids = self._short_prefix_ids[prefix] = set()
+                ids.add(track.track_id)
+
+        if len(new_words) > len(self._words) // 64:
+            self._words = sorted(self._word_ids)
+        else:
+            for word in new_words:
+                bisect.insort(self._words, word)
+        self._invalidate_results()
+
+    def _remove_track_ids(self, track_ids: List[int]) -> None:
+        for track_id in track_ids:
+            words = self._track_words.pop(track_id, None)
+            if words is None:
+                continue
+            for word in words:
+                ids = self._word_ids[word]
+                ids.discard(track_id)
+                if not ids:
+                    del self._word_ids[word]
+                    del self._words[bisect.bisect_left(self._words, word)]
+            for prefix in self._get_short_prefixes(words):
+                ids = self._short_prefix_ids[prefix]
+                ids.discard(track_id)
+                if not ids:
+                    del self._short_prefix_ids[prefix]
+        self._invalidate_results()
+
+    def _invalidate_results(self) -> None:
+        self._prefix_ids.clear()
+        self._last_query = ""
+        self._last_ids = set()
+
+    @staticmethod
+    def _get_short_prefixes(words: Tuple[str, ...]) -> Set[str]:
+        return {word[:length] for word in words for length in (1, 2)}
+
+    def _get_prefix_ids(self, prefix: str) -> Set[int]:
+        if len(prefix) <= 2:
+            return self._short_prefix_ids.get(prefix, set())
+        if prefix in self._prefix_ids:
+            self._prefix_ids.move_to_end(prefix)
+            return self._prefix_ids[prefix]
+
+        start = bisect.bisect_left(self._words, prefix)
+        end = bisect.bisect_left(self._words, prefix[:-1] + chr(ord(prefix[-1]) + 1), start)
+        if end - start == 1:
+            return self._word_ids[self._words[start]]
+        ids = set().union(*map(self._word_ids.__getitem__, self._words[start:end]))
+
+        self._prefix_ids[prefix] = ids
+        if len(self._prefix_ids) > constants.SEARCH_PREFIX_CACHE_SIZE:
+            self._prefix_ids.popitem(last=False)
+        return ids
+
+    @staticmethod
+    def narrows(query: str, last_query: str) -> bool:
+        """Whether every track matching the query also matches the last one, which is the case when the query's
+        words extend the last query's words, with possibly more words after them."""
+        query_words, last_query_words = get_words(query), get_words(last_query)
+        return (bool(last_query_words) and len(query_words) >= len(last_query_words) and
+                all(word.startswith(last_word) for word, last_word in zip(query_words, last_query_words)))
+
+
+if __name__ == '__main__':
+    import random
+    import time
+
+    track_count = 100_000
+    syllables = ["ka", "lo", "mi", "ne", "ru", "sa", "to", "vi", "ze", "an", "el", "or"]
+    random.seed(0)
+
+    def random_name(words: int) -> str:
+        return " ".join("".join(random.choices(syllables, k=random.randint(2, 4))).title() for _ in range(words))
+
+    artists = [random_name(2) for _ in range(2000)]
+    albums = [random_name(3) for _ in range(8000)]
+    tracks = [Track(i, f"/Music/{i:06d}.mp3", random_name(3), random.choice(albums), random.choice(artists), None,
+                    random.choice(["Rock", "Jazz", "Hip-Hop", "Classical"]), 2000, 240, 8_000_000)
+              for i in range(track_count)]
+
+    start_time = time.perf_counter()
+    track_search_index = TrackSearchIndex(tracks)
+    print(f"Indexed {track_count} tracks in {time.perf_counter() - start_time:.2f} s")
+
+    start_time = time.perf_counter()
+    track_search_index.remove_tracks(tracks[:100])
+    track_search_index.add_tracks(tracks[:100])
+    print(f"Removed and added 100 tracks in {(time.perf_counter() - start_time) * 1000:.2f} ms")
+
+    queries = [f"{tracks[0].artist} {tracks[0].album}".lower(), "rock ka ro", "ka rock"]
+    slowest = 0
+    for query in queries:
+        for length in range(1, len(query) + 1):
+            start_time = time.perf_counter()
+            result = track_search_index.search(query[:length])
+            elapsed = (time.perf_counter() - start_time) * 1000
+            slowest = max(slowest, elapsed)
+            print(f"{query[:length]!r:40} {len(result or ()):6} tracks {elapsed:6.2f} ms")
+    print(f"Slowest keystroke {slowest:.2f} ms")